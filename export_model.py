@@ -0,0 +1,58 @@
+"""
+Export the trained MedBERT risk classifier to ONNX
+Produces saved_medbert_model/model.onnx (and model.int8.onnx with --int8),
+which ml_service.py serves through ONNX Runtime when it is installed
+"""
+import argparse
+import os
+
+import torch
+from transformers import BertModel
+
+from ml_service import RiskClassifier
+
+
+def export_onnx(model_dir="saved_medbert_model", int8=False, opset_version=17):
+    """Export the classifier with dynamic batch/sequence axes, optionally with INT8 weights"""
+    checkpoint = torch.load(os.path.join(model_dir, "classifier_weights.pth"), map_location="cpu", weights_only=False)
+    num_classes = checkpoint.get('num_classes', 3)
+    max_len = checkpoint.get('model_config', {}).get('max_len', 512)
+
+    bert_model = BertModel.from_pretrained(model_dir, local_files_only=True)
+    model = RiskClassifier(n_classes=num_classes, pre_trained_model=bert_model)
+    model.load_state_dict(checkpoint.get('model_state_dict', checkpoint))
+    model.eval()
+
+    onnx_path = os.path.join(model_dir, "model.onnx")
+    dummy_ids = torch.ones((1, min(max_len, 32)), dtype=torch.long)
+    dummy_mask = torch.ones_like(dummy_ids)
+    torch.onnx.export(
+        model,
+        (dummy_ids, dummy_mask),
+        onnx_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch'},
+        },
+        opset_version=opset_version,
+        dynamo=False,
+    )
+    print(f"✅ Exported {onnx_path}")
+
+    if int8:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        int8_path = os.path.join(model_dir, "model.int8.onnx")
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ Quantized weights to INT8: {int8_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the MedBERT risk classifier to ONNX")
+    parser.add_argument("--model-dir", default="saved_medbert_model")
+    parser.add_argument("--int8", action="store_true", help="also write an INT8 dynamically quantized model for CPU")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export_onnx(args.model_dir, int8=args.int8, opset_version=args.opset)
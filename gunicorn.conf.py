@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for the root FastAPI ML service
+Usage: gunicorn -c gunicorn.conf.py ml_service:app
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# uvicorn[standard] installs uvloop and httptools, which UvicornWorker picks up automatically
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Each worker is a separate process, so the regex and keyword work is not serialized
+# behind a single GIL, but each one also loads its own MedBERT copy (a few hundred MB),
+# so the default stays at 2; raise WORKERS towards the core count when memory allows
+workers = int(os.environ.get('WORKERS', '2'))
+
+# The app reads WORKERS to give each worker CPU_COUNT // WORKERS heuristics threads;
+# export the count chosen here so forked workers agree with it
+os.environ.setdefault('WORKERS', str(workers))
+
+# Import torch/transformers once in the master before forking; each worker still
+# loads MedBERT in its own background thread at startup
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
@@ -1,42 +1,88 @@
 import torch
 import torch.nn as nn
 from transformers import AutoTokenizer, AutoModel
-from torch.utils.data import Dataset, DataLoader
 import os
+import json
+from contextlib import contextmanager
+from safetensors import safe_open
+from safetensors.torch import save_file
 
-# Import your custom classes (make sure they match your original definitions)
-class RiskDataset(Dataset):
-    def __init__(self, texts, labels, tokenizer, max_len):
-        self.texts = texts
-        self.labels = labels
-        self.tokenizer = tokenizer
-        self.max_len = max_len
-
-    def __len__(self):
-        return len(self.texts)
-
-    def __getitem__(self, item):
-        text = str(self.texts[item])
-        label = self.labels[item]
-        
-        encoding = self.tokenizer.encode_plus(
-            text,
-            add_special_tokens=True,
-            max_length=self.max_len,
-            return_token_type_ids=False,
-            padding='max_length',
-            truncation=True,
-            return_attention_mask=True,
-            return_tensors='pt',
-        )
-        
-        return {
-            'text': text,
-            'input_ids': encoding['input_ids'].flatten(),
-            'attention_mask': encoding['attention_mask'].flatten(),
-            'labels': torch.tensor(label, dtype=torch.long)
-        }
+# Dynamic INT8 quantization of the Linear layers for CPU inference (USE_INT8=0 to disable)
+USE_INT8 = os.environ.get('USE_INT8', '1') == '1'
 
+# Prefer FBGEMM (x86 AVX2/VNNI) kernels for quantized ops, QNNPACK on ARM
+if 'fbgemm' in torch.backends.quantized.supported_engines:
+    torch.backends.quantized.engine = 'fbgemm'
+elif 'qnnpack' in torch.backends.quantized.supported_engines:
+    torch.backends.quantized.engine = 'qnnpack'
+
+# Half-precision weights + autocast on CUDA (USE_FP16=0 to disable)
+USE_FP16 = os.environ.get('USE_FP16', '1') == '1'
+
+@contextmanager
+def inference_context(device):
+    """inference_mode, plus FP16 autocast when serving on CUDA"""
+    with torch.inference_mode(), torch.autocast(device.type, dtype=torch.float16,
+                                                enabled=device.type == 'cuda' and USE_FP16):
+        yield
+
+# torch.compile the classifier at load time (USE_TORCH_COMPILE=1 to enable)
+USE_TORCH_COMPILE = os.environ.get('USE_TORCH_COMPILE', '0') == '1'
+
+# Sequence lengths that inputs are padded up to when the model is compiled
+LENGTH_BUCKETS = (32, 64, 128, 256, 512)
+
+def bucket_length(length, max_len):
+    """Round a token count up to the nearest padding bucket (capped at max_len)"""
+    for bucket in LENGTH_BUCKETS:
+        if length <= bucket:
+            return min(bucket, max_len)
+    return max_len
+
+def compile_model(model, device, max_len, warmup_steps=3):
+    """
+    Compile the model and trigger compilation with warmup passes at every length bucket,
+    with one and two texts so batches of any size hit a dynamic batch dimension
+    instead of recompiling on the first predictions; falls back to eager on failure
+    """
+    try:
+        compiled = torch.compile(model, mode='reduce-overhead')
+        lengths = sorted({bucket_length(length, max_len) for length in LENGTH_BUCKETS} | {max_len})
+        # Inputs are created outside inference mode, like the tokenizer's tensors, and ids
+        # and mask are separate tensors: inference tensors (different dispatch keys) or one
+        # tensor passed twice (an aliasing guard) would not match the real inputs' guards
+        dummy_inputs = [(torch.ones((rows, length), dtype=torch.long, device=device),
+                         torch.ones((rows, length), dtype=torch.long, device=device))
+                        for length in lengths for rows in (1, 2)]
+        with inference_context(device):
+            for dummy_ids, dummy_mask in dummy_inputs:
+                for _ in range(warmup_steps):
+                    compiled(input_ids=dummy_ids, attention_mask=dummy_mask)
+        print(f"Compiled model with torch.compile (warmed up at lengths {lengths})")
+        return compiled
+    except Exception as e:
+        print(f"torch.compile unavailable, using eager model: {e}")
+        return model
+
+def pad_token_ids(tokenizer, input_ids, max_len):
+    """
+    Pad a list of token id lists into ids and mask tensors: to the longest text, or to
+    its length bucket when the model is compiled and only the warmed-up shapes are fast
+    """
+    if USE_TORCH_COMPILE:
+        padding, pad_length = 'max_length', bucket_length(max(len(ids) for ids in input_ids), max_len)
+    else:
+        padding, pad_length = 'longest', None
+    encoding = tokenizer.pad(
+        {'input_ids': input_ids},
+        padding=padding,
+        max_length=pad_length,
+        return_attention_mask=True,
+        return_tensors='pt',
+    )
+    return encoding['input_ids'], encoding['attention_mask']
+
+# Import your custom classes (make sure they match your original definitions)
 class RiskClassifier(nn.Module):
     def __init__(self, n_classes, pre_trained_model):
         super(RiskClassifier, self).__init__()
@@ -49,21 +95,79 @@ class RiskClassifier(nn.Module):
         output = self.drop(output.last_hidden_state[:, 0, :])
         return self.out(output)
 
+def save_safetensors_checkpoint(path, state_dict, label_mapping, num_classes, model_config):
+    """
+    Save classifier weights as safetensors, with the label mapping and config in the header metadata
+    """
+    save_file(
+        {k: v.contiguous() for k, v in state_dict.items()},
+        path,
+        metadata={
+            'label_mapping': json.dumps(label_mapping),
+            'num_classes': str(num_classes),
+            'model_config': json.dumps(model_config),
+        },
+    )
+
+def load_safetensors_checkpoint(path, device):
+    """
+    Memory-map a safetensors checkpoint, returning the same dict layout as the .pth checkpoint
+    """
+    with safe_open(path, framework='pt', device=str(device)) as f:
+        metadata = f.metadata()
+        state_dict = {key: f.get_tensor(key) for key in f.keys()}
+    return {
+        'model_state_dict': state_dict,
+        'label_mapping': json.loads(metadata['label_mapping']),
+        'num_classes': int(metadata['num_classes']),
+        'model_config': json.loads(metadata['model_config']),
+    }
+
+def convert_checkpoint_to_safetensors(model_dir="saved_medbert_model"):
+    """
+    One-time conversion of classifier_weights.pth to classifier_weights.safetensors
+    """
+    checkpoint = torch.load(os.path.join(model_dir, "classifier_weights.pth"), map_location="cpu", weights_only=False)
+    path = os.path.join(model_dir, "classifier_weights.safetensors")
+    save_safetensors_checkpoint(
+        path,
+        checkpoint['model_state_dict'],
+        checkpoint['label_mapping'],
+        checkpoint['num_classes'],
+        checkpoint['model_config'],
+    )
+    print(f"✅ Saved {path}")
+    return path
+
 def load_trained_model(model_dir="saved_medbert_model"):
     """
     Load the trained model from the saved directory
+    Returns (model, tokenizer, label_mapping, reverse_label_mapping, model_config, device);
+    reverse_label_mapping is the index -> label lookup the predict helpers take
     """
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     
     print(f"Loading model from {model_dir}...")
     print(f"Using device: {device}")
     
-    # Load the saved metadata and weights
-    checkpoint_path = os.path.join(model_dir, "classifier_weights.pth")
-    checkpoint = torch.load(checkpoint_path, map_location=device, weights_only=False)
+    if device.type == 'cuda':
+        # TF32 matmuls on Ampere+ and cuDNN autotuning for the fixed bucket shapes
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision('high')
+    
+    # Load the saved metadata and weights (safetensors preferred, legacy pickle as fallback)
+    safetensors_path = os.path.join(model_dir, "classifier_weights.safetensors")
+    if os.path.exists(safetensors_path):
+        checkpoint = load_safetensors_checkpoint(safetensors_path, device)
+    else:
+        checkpoint_path = os.path.join(model_dir, "classifier_weights.pth")
+        checkpoint = torch.load(checkpoint_path, map_location=device, weights_only=False)
     
     # Extract configuration
     label_mapping = checkpoint['label_mapping']
+    reverse_label_mapping = {v: k for k, v in label_mapping.items()}
     num_classes = checkpoint['num_classes']
     model_config = checkpoint['model_config']
     
@@ -82,78 +186,89 @@ def load_trained_model(model_dir="saved_medbert_model"):
     model = model.to(device)
     model.eval()
     
+    if device.type == 'cpu' and USE_INT8:
+        torch.set_num_threads(os.cpu_count())
+        model = torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+        print("Applied dynamic INT8 quantization to Linear layers")
+    elif device.type == 'cuda' and USE_FP16:
+        model = model.half()
+        print("Converted model to FP16")
+    
+    if USE_TORCH_COMPILE:
+        model = compile_model(model, device, model_config['max_len'])
+    
     print("✅ Model loaded successfully!")
     
-    return model, tokenizer, label_mapping, model_config, device
+    return model, tokenizer, label_mapping, reverse_label_mapping, model_config, device
 
-def predict_single(model, tokenizer, text, label_mapping, max_len, device):
+def predict_single(model, tokenizer, text, reverse_label_mapping, max_len, device):
     """
     Make a prediction on a single text input
+    Expects a model in eval mode and the reverse label mapping, as returned by load_trained_model
     """
-    model.eval()
-    reverse_label_mapping = {v: k for k, v in label_mapping.items()}
-    
     # Prepare the input
-    encoding = tokenizer.encode_plus(
+    # No padding: a single text only needs as many positions as it has tokens,
+    # unless the compiled model needs its length bucket
+    encoding = tokenizer(
         text,
         add_special_tokens=True,
         max_length=max_len,
         return_token_type_ids=False,
-        padding='max_length',
         truncation=True,
-        return_attention_mask=True,
-        return_tensors='pt',
+        return_attention_mask=False,
     )
+    input_ids, attention_mask = pad_token_ids(tokenizer, [encoding['input_ids']], max_len)
     
-    input_ids = encoding['input_ids'].to(device)
-    attention_mask = encoding['attention_mask'].to(device)
+    input_ids = input_ids.to(device)
+    attention_mask = attention_mask.to(device)
     
     # Make prediction
-    with torch.no_grad():
+    with inference_context(device):
         outputs = model(input_ids=input_ids, attention_mask=attention_mask)
         probabilities = torch.softmax(outputs, dim=1)
-        _, prediction = torch.max(outputs, dim=1)
-        confidence = probabilities[0][prediction].item()
+        confidence, prediction = probabilities.max(dim=1)
     
+    confidence = confidence.item()
     predicted_label = reverse_label_mapping.get(prediction.item(), "Unknown")
     
     return predicted_label, confidence, probabilities[0].cpu().numpy()
 
-def predict_batch(model, tokenizer, texts, label_mapping, max_len, device, batch_size=16):
+def predict_batch(model, tokenizer, texts, reverse_label_mapping, max_len, device, batch_size=16):
     """
     Make predictions on a batch of texts
+    Expects a model in eval mode and the reverse label mapping, as returned by load_trained_model
     """
-    model.eval()
-    reverse_label_mapping = {v: k for k, v in label_mapping.items()}
-    
-    # Create dataset and dataloader
-    dummy_labels = [0] * len(texts)  # Dummy labels for prediction
-    dataset = RiskDataset(texts, dummy_labels, tokenizer, max_len)
-    dataloader = DataLoader(dataset, batch_size=batch_size)
-    
     predictions = []
     confidences = []
     
-    with torch.no_grad():
-        for batch in dataloader:
-            input_ids = batch['input_ids'].to(device)
-            attention_mask = batch['attention_mask'].to(device)
-            
+    # Tokenize each chunk in one batched call, padded to the chunk's longest text
+    # (or its length bucket when compiled)
+    for start in range(0, len(texts), batch_size):
+        encoding = tokenizer(
+            texts[start:start + batch_size],
+            add_special_tokens=True,
+            max_length=max_len,
+            return_token_type_ids=False,
+            truncation=True,
+            return_attention_mask=False,
+        )
+        input_ids, attention_mask = pad_token_ids(tokenizer, encoding['input_ids'], max_len)
+        input_ids = input_ids.to(device)
+        attention_mask = attention_mask.to(device)
+        
+        with inference_context(device):
             outputs = model(input_ids=input_ids, attention_mask=attention_mask)
             probabilities = torch.softmax(outputs, dim=1)
-            _, batch_predictions = torch.max(outputs, dim=1)
-            
-            for i, pred in enumerate(batch_predictions):
-                predicted_label = reverse_label_mapping.get(pred.item(), "Unknown")
-                confidence = probabilities[i][pred].item()
-                predictions.append(predicted_label)
-                confidences.append(confidence)
+            batch_confidences, batch_predictions = probabilities.max(dim=1)
+        
+        predictions.extend(reverse_label_mapping.get(pred, "Unknown") for pred in batch_predictions.tolist())
+        confidences.extend(batch_confidences.tolist())
     
     return predictions, confidences
 
 if __name__ == "__main__":
     # Load the model
-    model, tokenizer, label_mapping, config, device = load_trained_model()
+    model, tokenizer, label_mapping, reverse_mapping, config, device = load_trained_model()
     
     # Test with a single prediction
     print("\n" + "="*60)
@@ -162,7 +277,7 @@ if __name__ == "__main__":
     
     test_text = "Patient requests specific controlled substances by name without examination."
     predicted_label, confidence, probabilities = predict_single(
-        model, tokenizer, test_text, label_mapping, config['max_len'], device
+        model, tokenizer, test_text, reverse_mapping, config['max_len'], device
     )
     
     print(f"Text: '{test_text}'")
@@ -170,7 +285,6 @@ if __name__ == "__main__":
     print(f"Confidence: {confidence:.4f}")
     
     # Show all class probabilities
-    reverse_mapping = {v: k for k, v in label_mapping.items()}
     print("\nAll class probabilities:")
     for idx, prob in enumerate(probabilities):
         class_name = reverse_mapping.get(idx, f"Class_{idx}")
@@ -189,7 +303,7 @@ if __name__ == "__main__":
     ]
     
     predictions, confidences = predict_batch(
-        model, tokenizer, test_texts, label_mapping, config['max_len'], device
+        model, tokenizer, test_texts, reverse_mapping, config['max_len'], device
     )
     
     for i, (text, pred, conf) in enumerate(zip(test_texts, predictions, confidences)):
@@ -0,0 +1,63 @@
+"""
+Dynamic request batching for the MedBERT services
+Coalesces concurrent single-text requests into one batched model call
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class DynamicBatcher:
+    """
+    Collects concurrent requests and runs them through one batched call.
+
+    `batch_fn` receives a list of items and must return a list of results in
+    the same order. Each caller gets its own result back through a Future,
+    so the batcher works for threaded servers (Flask) as well as asyncio
+    ones via `asyncio.wrap_future(batcher.submit(item))`.
+    """
+    def __init__(self, batch_fn, max_batch_size=32, max_wait_ms=5.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="dynamic-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queue a single item and return a Future for its result"""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item):
+        """Blocking helper: submit an item and wait for its result"""
+        return self.submit(item).result()
+
+    def _collect(self):
+        """Wait for one item, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,24 @@
+"""
+Gunicorn configuration for the FastAPI ML service
+Usage: gunicorn -c gunicorn.conf.py ml_service_fastapi:app
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# One worker per core by default; each worker is a separate process, so
+# tokenization and regex work is not serialized behind a single GIL. The app
+# reads the same WORKERS variable and gives each worker CPU_COUNT // WORKERS
+# torch and thread-pool threads, so the total stays close to the core count
+workers = int(os.environ.get('WORKERS', os.cpu_count() or 1))
+
+# Export the count chosen here before the app is imported, so a default worker
+# count does not leave every worker sized for WORKERS=1 (all cores each)
+os.environ.setdefault('WORKERS', str(workers))
+
+# Import the app (and load the model) once in the master before forking, so
+# the weights are shared copy-on-write instead of loaded once per worker
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
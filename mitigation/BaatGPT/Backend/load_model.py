@@ -85,8 +85,7 @@ def load_trained_model(model_dir="../saved_medbert_model"):
     return model, tokenizer, label_mapping, model_config, device
 
 def predict_single(model, tokenizer, text, label_mapping, max_len, device):
-    """Make a prediction on a single text input"""
-    model.eval()
+    """Make a prediction on a single text input (expects a model in eval mode, as returned by load_trained_model)"""
     reverse_label_mapping = {v: k for k, v in label_mapping.items()}
     
     # Prepare the input
@@ -116,8 +115,7 @@ def predict_single(model, tokenizer, text, label_mapping, max_len, device):
     return predicted_label, confidence, probabilities[0].cpu().numpy()
 
 def predict_batch(model, tokenizer, texts, label_mapping, max_len, device, batch_size=16):
-    """Make predictions on a batch of texts"""
-    model.eval()
+    """Make predictions on a batch of texts (expects a model in eval mode, as returned by load_trained_model)"""
     reverse_label_mapping = {v: k for k, v in label_mapping.items()}
     
     # Create dataset and dataloader
@@ -2,17 +2,212 @@
 AI Risk Mitigation ML Service
 FastAPI service for analyzing AI-generated text for various risk factors
 """
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from flask import Flask, request, jsonify
+from flask_cors import CORS
 import torch
 import torch.nn as nn
-from transformers import BertModel, BertTokenizer
+from transformers import BertModel, BertTokenizerFast
+from safetensors.torch import load_file
 import re
+import os
 import logging
 from datetime import datetime
 from typing import Optional
 import time
+import threading
+from contextlib import contextmanager
+
+from batching import DynamicBatcher
+from prediction_cache import PredictionCache
+
+# Optional ONNX Runtime backend for CPU serving
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+# Dynamic INT8 quantization of the Linear layers for CPU inference (USE_INT8=0 to disable)
+USE_INT8 = os.environ.get('USE_INT8', '1') == '1'
+
+# Prefer FBGEMM (x86 AVX2/VNNI) kernels for quantized ops, QNNPACK on ARM
+if 'fbgemm' in torch.backends.quantized.supported_engines:
+    torch.backends.quantized.engine = 'fbgemm'
+elif 'qnnpack' in torch.backends.quantized.supported_engines:
+    torch.backends.quantized.engine = 'qnnpack'
+
+# Half-precision weights + autocast on CUDA (USE_FP16=0 to disable)
+USE_FP16 = os.environ.get('USE_FP16', '1') == '1'
+
+@contextmanager
+def inference_context(device):
+    """inference_mode, plus FP16 autocast when serving on CUDA"""
+    with torch.inference_mode(), torch.autocast(device.type, dtype=torch.float16,
+                                                enabled=device.type == 'cuda' and USE_FP16):
+        yield
+
+# torch.compile the classifier at load time (USE_TORCH_COMPILE=1 to enable)
+USE_TORCH_COMPILE = os.environ.get('USE_TORCH_COMPILE', '0') == '1'
+
+def compile_model(model, device, max_len, warmup_steps=3):
+    """
+    Compile the model and trigger compilation with warmup passes at every length bucket,
+    with one and two texts so the batcher's varying batch sizes hit a dynamic batch
+    dimension instead of recompiling inside a request; falls back to eager on failure
+    """
+    try:
+        compiled = torch.compile(model, mode='reduce-overhead')
+        lengths = sorted({bucket_length(length, max_len) for length in LENGTH_BUCKETS} | {max_len})
+        # Inputs are created outside inference mode, like the tokenizer's tensors, and ids
+        # and mask are separate tensors: inference tensors (different dispatch keys) or one
+        # tensor passed twice (an aliasing guard) would not match the real inputs' guards
+        dummy_inputs = [(torch.ones((rows, length), dtype=torch.long, device=device),
+                         torch.ones((rows, length), dtype=torch.long, device=device))
+                        for length in lengths for rows in (1, 2)]
+        with inference_context(device):
+            for dummy_ids, dummy_mask in dummy_inputs:
+                for _ in range(warmup_steps):
+                    compiled(input_ids=dummy_ids, attention_mask=dummy_mask)
+        print(f"Compiled model with torch.compile (warmed up at lengths {lengths})")
+        return compiled
+    except Exception as e:
+        print(f"torch.compile unavailable, using eager model: {e}")
+        return model
+
+# Serve the classifier through an INT8 ONNX Runtime session on CPU (USE_ONNX=1 to enable)
+USE_ONNX = os.environ.get('USE_ONNX', '0') == '1'
+
+class OnnxRiskClassifier:
+    """
+    Drop-in replacement for RiskClassifier.forward backed by an ONNX Runtime session.
+    Takes and returns torch tensors so the prediction helpers work unchanged.
+    """
+    def __init__(self, onnx_path):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_ids, attention_mask):
+        logits, = self.session.run(None, {
+            'input_ids': input_ids.cpu().numpy(),
+            'attention_mask': attention_mask.cpu().numpy(),
+        })
+        return torch.from_numpy(logits)
+
+def export_onnx_model(model, model_dir, max_len):
+    """
+    Export the FP32 classifier to ONNX with dynamic batch/sequence axes, quantize its
+    weights to INT8 and open an ONNX Runtime session. Returns None on failure.
+    A previously exported model is reused unless a weights file is newer than it.
+    """
+    onnx_path = os.path.join(model_dir, "risk.onnx")
+    int8_path = os.path.join(model_dir, "risk.int8.onnx")
+    weights_mtime = max(
+        (os.path.getmtime(path) for path in (
+            os.path.join(model_dir, "classifier_weights.safetensors"),
+            os.path.join(model_dir, "classifier_weights.pth"),
+        ) if os.path.exists(path)),
+        default=0.0,
+    )
+    try:
+        if not os.path.exists(int8_path) or os.path.getmtime(int8_path) < weights_mtime:
+            dummy_ids = torch.ones((1, min(max_len, LENGTH_BUCKETS[0])), dtype=torch.long)
+            dummy_mask = torch.ones_like(dummy_ids)
+            torch.onnx.export(
+                model,
+                (dummy_ids, dummy_mask),
+                onnx_path,
+                input_names=['input_ids', 'attention_mask'],
+                output_names=['logits'],
+                dynamic_axes={
+                    'input_ids': {0: 'batch', 1: 'sequence'},
+                    'attention_mask': {0: 'batch', 1: 'sequence'},
+                    'logits': {0: 'batch'},
+                },
+                opset_version=17,
+                dynamo=False,
+            )
+            quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        onnx_model = OnnxRiskClassifier(int8_path)
+        print(f"Serving INT8 ONNX Runtime model from {int8_path}")
+        return onnx_model
+    except Exception as e:
+        print(f"ONNX export failed, using PyTorch model: {e}")
+        return None
+
+# Replay captured CUDA graphs for single-text forwards (USE_CUDA_GRAPHS=1 to enable)
+USE_CUDA_GRAPHS = os.environ.get('USE_CUDA_GRAPHS', '0') == '1'
+
+class CUDAGraphRunner:
+    """
+    Forward pass captured once per padded length at batch size 1 and replayed,
+    so a single-text request costs one graph launch instead of ~200 kernel launches.
+    Each graph reads and writes shared static buffers, so replays are serialized: the
+    batcher thread and /predict/batch request threads both reach this runner.
+    """
+    def __init__(self, model, device, lengths, warmup_steps=3):
+        self.graphs = {}
+        self.lock = threading.Lock()
+        for length in lengths:
+            static_ids = torch.zeros((1, length), dtype=torch.long, device=device)
+            static_mask = torch.ones((1, length), dtype=torch.long, device=device)
+            
+            # Warm up on a side stream so lazy allocations happen outside the capture
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(stream), inference_context(device):
+                for _ in range(warmup_steps):
+                    model(input_ids=static_ids, attention_mask=static_mask)
+            torch.cuda.current_stream().wait_stream(stream)
+            
+            graph = torch.cuda.CUDAGraph()
+            with inference_context(device), torch.cuda.graph(graph):
+                static_out = model(input_ids=static_ids, attention_mask=static_mask)
+            self.graphs[length] = (graph, static_ids, static_mask, static_out)
+
+    def supports(self, input_ids):
+        return input_ids.shape[0] == 1 and input_ids.shape[1] in self.graphs
+
+    def __call__(self, input_ids, attention_mask):
+        graph, static_ids, static_mask, static_out = self.graphs[input_ids.shape[1]]
+        with self.lock:
+            static_ids.copy_(input_ids)
+            static_mask.copy_(attention_mask)
+            graph.replay()
+            return static_out.clone()
+
+def capture_cuda_graphs(model, device, max_len):
+    """Capture one graph per length bucket (and max_len), or return None if capture is not possible"""
+    if device.type != 'cuda':
+        return None
+    lengths = sorted({min(bucket, max_len) for bucket in LENGTH_BUCKETS} | {max_len})
+    try:
+        runner = CUDAGraphRunner(model, device, lengths)
+        print(f"Captured CUDA graphs for lengths {lengths}")
+        return runner
+    except Exception as e:
+        print(f"CUDA graph capture failed, using eager forward: {e}")
+        return None
+
+def run_forward(model, input_ids, attention_mask):
+    """Replay a captured CUDA graph when one matches the input shape, else call the model"""
+    if cuda_graphs is not None and cuda_graphs.supports(input_ids):
+        return cuda_graphs(input_ids, attention_mask)
+    return model(input_ids=input_ids, attention_mask=attention_mask)
+
+# Dynamic batching: concurrent /predict calls share one forward pass
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '32'))
+MAX_BATCH_WAIT_MS = float(os.environ.get('MAX_BATCH_WAIT_MS', '5'))
+
+# Cache of /predict results keyed on the text hash (PREDICTION_CACHE_SIZE=0 to disable)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))
+
+# Sequence lengths that batches are padded up to
+LENGTH_BUCKETS = (64, 128, 256, 512)
 
 # Configure logging
 logging.basicConfig(
@@ -34,83 +229,29 @@ class RiskClassifier(nn.Module):
         output = self.drop(output.last_hidden_state[:, 0, :])
         return self.out(output)
 
-def read_file_contents(filepath):
-    """Helper function to read and validate file contents"""
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-            print(f"\nFirst 100 characters of {os.path.basename(filepath)}:")
-            print(content[:100])
-            return content
-    except Exception as e:
-        print(f"Error reading {filepath}: {str(e)}")
-        return None
-
 def load_trained_model(model_dir="../saved_medbert_model"):
-    """Load the trained model from the saved directory"""
+    """
+    Load the trained model from the saved directory
+    Returns (model, tokenizer, label_mapping, reverse_label_mapping, model_config, device);
+    reverse_label_mapping is the index -> label lookup the predict helpers take
+    """
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     
     print(f"Loading model from {model_dir}...")
     print(f"Using device: {device}")
     
-    # Check what files are available in the model directory
-    if os.path.exists(model_dir):
-        print("\nAvailable files in model directory:")
-        for file in os.listdir(model_dir):
-            print(f"- {file}")
-    else:
-        print(f"\nWarning: Model directory {model_dir} does not exist")
+    if device.type == 'cuda':
+        # TF32 matmuls on Ampere+ and cuDNN autotuning for the fixed bucket shapes
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision('high')
     
     # Initialize default configuration
-    default_config = {
-        'label_mapping': {'Low Risk': 0, 'Medium Risk': 1, 'High Risk': 2},
-        'num_classes': 3,
-        'model_config': {'max_len': 512}
-    }
-    
-    # Try to load the model configuration from tokenizer config
-    tokenizer_config_path = os.path.join(model_dir, "tokenizer_config.json")
-    config_path = os.path.join(model_dir, "config.json")
-    
-    # Check contents of config files
-    for config_file in [tokenizer_config_path, config_path]:
-        content = read_file_contents(config_file)
-        if content:
-            print(f"\nFile exists and has content")
-        else:
-            print(f"\nFile is empty or invalid")
-    
-    try:
-        print(f"\nLoading tokenizer config from: {tokenizer_config_path}")
-        with open(tokenizer_config_path, 'r', encoding='utf-8') as f:
-            tokenizer_config = json.load(f)
-            print("Tokenizer config loaded successfully")
-    except Exception as e:
-        print(f"Warning: Could not load tokenizer config: {str(e)}")
-        tokenizer_config = {}
-    
-    try:
-        print(f"Loading model config from: {config_path}")
-        with open(config_path, 'r', encoding='utf-8') as f:
-            model_config = json.load(f)
-            print("Model config loaded successfully")
-    except Exception as e:
-        print(f"Warning: Could not load model config: {str(e)}")
-        model_config = {}
-    
-    # Merge configs with defaults
-    model_config = {
-        **default_config['model_config'],
-        **model_config
-    }
-    
-    # Use the default label mapping and number of classes
-    checkpoint = default_config
-    
-    # Extract configuration
-    label_mapping = checkpoint['label_mapping']
-    num_classes = checkpoint['num_classes']
-    model_config = checkpoint['model_config']
+    label_mapping = {'Low Risk': 0, 'Medium Risk': 1, 'High Risk': 2}
+    reverse_label_mapping = {v: k for k, v in label_mapping.items()}
+    num_classes = 3
+    model_config = {'max_len': 512}
     
     print(f"Number of classes: {num_classes}")
     print(f"Labels: {list(label_mapping.keys())}")
@@ -118,17 +259,22 @@ def load_trained_model(model_dir="../saved_medbert_model"):
     try:
         # Initialize base BERT model and tokenizer
         print("Initializing base BERT model and tokenizer...")
-        tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
+        tokenizer = BertTokenizerFast.from_pretrained('bert-base-uncased')
         bert_model = BertModel.from_pretrained('bert-base-uncased')
         
         # Create the classifier
         print("Creating classifier...")
         model = RiskClassifier(n_classes=num_classes, pre_trained_model=bert_model)
         
-        # Load the trained weights
+        # Load the trained weights (memory-mapped safetensors preferred over the pickle)
         print("Loading classifier weights...")
+        safetensors_path = os.path.join(model_dir, "classifier_weights.safetensors")
         weights_path = os.path.join(model_dir, "classifier_weights.pth")
-        if os.path.exists(weights_path):
+        if os.path.exists(safetensors_path):
+            print(f"Loading weights from: {safetensors_path}")
+            model.load_state_dict(load_file(safetensors_path, device=str(device)))
+            print("Classifier weights loaded successfully")
+        elif os.path.exists(weights_path):
             try:
                 print(f"Attempting to load weights from: {weights_path}")
                 state_dict = torch.load(weights_path, map_location=device, weights_only=False)
@@ -155,72 +301,125 @@ def load_trained_model(model_dir="../saved_medbert_model"):
         print(f"Error loading models: {str(e)}")
         raise
     
-    # Model is already loaded with weights from safetensors
     model = model.to(device)
     model.eval()
     
+    if device.type == 'cpu' and USE_ONNX and ONNXRUNTIME_AVAILABLE:
+        onnx_model = export_onnx_model(model, model_dir, model_config['max_len'])
+        if onnx_model is not None:
+            print("✅ Model loaded successfully!")
+            return onnx_model, tokenizer, label_mapping, reverse_label_mapping, model_config, device
+    
+    if device.type == 'cpu' and USE_INT8:
+        torch.set_num_threads(os.cpu_count())
+        model = torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+        print("Applied dynamic INT8 quantization to Linear layers")
+    elif device.type == 'cuda' and USE_FP16:
+        model = model.half()
+        print("Converted model to FP16")
+    
+    if USE_TORCH_COMPILE:
+        model = compile_model(model, device, model_config['max_len'])
+    
     print("✅ Model loaded successfully!")
     
-    return model, tokenizer, label_mapping, model_config, device
+    return model, tokenizer, label_mapping, reverse_label_mapping, model_config, device
 
-def predict_single(model, tokenizer, text, label_mapping, max_len, device):
-    """Make a prediction on a single text input"""
-    model.eval()
-    reverse_label_mapping = {v: k for k, v in label_mapping.items()}
-    
-    # Prepare the input
-    encoding = tokenizer.encode_plus(
-        text,
+_staging = threading.local()
+
+def to_device(input_ids, attention_mask, device):
+    """
+    Move a batch to the device. On CUDA the ids and mask are staged through
+    per-thread pinned host and device buffers that are reused across requests,
+    so the copy is asynchronous and nothing is page-locked per call.
+    """
+    if device.type != 'cuda':
+        return input_ids, attention_mask
+    rows, length = input_ids.shape
+    numel = 2 * rows * length
+    buffers = getattr(_staging, 'buffers', None)
+    if buffers is None or buffers[0].numel() < numel:
+        capacity = max(numel, 2 * MAX_BATCH_SIZE * LENGTH_BUCKETS[-1])
+        buffers = (
+            torch.empty(capacity, dtype=torch.long, pin_memory=True),
+            torch.empty(capacity, dtype=torch.long, device=device),
+        )
+        _staging.buffers = buffers
+    host = buffers[0][:numel].view(2, rows, length)
+    host[0].copy_(input_ids)
+    host[1].copy_(attention_mask)
+    staged = buffers[1][:numel].view(2, rows, length)
+    staged.copy_(host, non_blocking=True)
+    return staged[0], staged[1]
+
+def predict_single(model, tokenizer, text, reverse_label_mapping, max_len, device):
+    """
+    Make a prediction on a single text input. The text is padded only up to its
+    length bucket rather than max_len, which also lets it hit a captured CUDA graph.
+    The model is put in eval mode once by load_trained_model.
+    """
+    return predict_texts(model, tokenizer, [text], reverse_label_mapping, max_len, device)[0]
+
+def bucket_length(length, max_len):
+    """Round a token count up to the nearest padding bucket (capped at max_len)"""
+    for bucket in LENGTH_BUCKETS:
+        if length <= bucket:
+            return min(bucket, max_len)
+    return max_len
+
+def predict_texts(model, tokenizer, texts, reverse_label_mapping, max_len, device):
+    """
+    Predict a list of texts, returning (label, confidence, probabilities) per text.
+    Texts are grouped by length bucket so short inputs never pay for max_len padding.
+    Each group is padded to its longest text (a single text is not padded at all);
+    only torch.compile and CUDA graphs need the fixed bucket shapes they were warmed for.
+    """
+    fixed_shapes = USE_TORCH_COMPILE or cuda_graphs is not None
+    encodings = tokenizer(
+        texts,
         add_special_tokens=True,
         max_length=max_len,
         return_token_type_ids=False,
-        padding='max_length',
         truncation=True,
-        return_attention_mask=True,
-        return_tensors='pt',
+        return_attention_mask=False,
     )
     
-    input_ids = encoding['input_ids'].to(device)
-    attention_mask = encoding['attention_mask'].to(device)
+    buckets = {}
+    for i, ids in enumerate(encodings['input_ids']):
+        buckets.setdefault(bucket_length(len(ids), max_len), []).append(i)
     
-    # Make prediction
-    with torch.no_grad():
-        outputs = model(input_ids=input_ids, attention_mask=attention_mask)
-        probabilities = torch.softmax(outputs, dim=1)
-        _, prediction = torch.max(outputs, dim=1)
-        confidence = probabilities[0][prediction].item()
-    
-    predicted_label = reverse_label_mapping.get(prediction.item(), "Unknown")
+    results = [None] * len(texts)
+    for length, indices in buckets.items():
+        batch = tokenizer.pad(
+            {'input_ids': [encodings['input_ids'][i] for i in indices]},
+            padding='max_length' if fixed_shapes else 'longest',
+            max_length=length if fixed_shapes else None,
+            return_attention_mask=True,
+            return_tensors='pt',
+        )
+        input_ids, attention_mask = to_device(batch['input_ids'], batch['attention_mask'], device)
+        
+        with inference_context(device):
+            outputs = run_forward(model, input_ids, attention_mask)
+            probabilities = torch.softmax(outputs, dim=1)
+            confidences, predictions = probabilities.max(dim=1)
+        
+        probabilities = probabilities.float().cpu().numpy()
+        for row, (i, pred, conf) in enumerate(zip(indices, predictions.tolist(), confidences.tolist())):
+            results[i] = (reverse_label_mapping.get(pred, "Unknown"), conf, probabilities[row])
     
-    return predicted_label, confidence, probabilities[0].cpu().numpy()
+    return results
 
-def predict_batch(model, tokenizer, texts, label_mapping, max_len, device, batch_size=16):
+def predict_batch(model, tokenizer, texts, reverse_label_mapping, max_len, device, batch_size=16):
     """Make predictions on a batch of texts"""
-    model.eval()
-    reverse_label_mapping = {v: k for k, v in label_mapping.items()}
-    
-    # Create dataset and dataloader
-    dummy_labels = [0] * len(texts)  # Dummy labels for prediction
-    dataset = RiskDataset(texts, dummy_labels, tokenizer, max_len)
-    dataloader = DataLoader(dataset, batch_size=batch_size)
-    
     predictions = []
     confidences = []
     
-    with torch.no_grad():
-        for batch in dataloader:
-            input_ids = batch['input_ids'].to(device)
-            attention_mask = batch['attention_mask'].to(device)
-            
-            outputs = model(input_ids=input_ids, attention_mask=attention_mask)
-            probabilities = torch.softmax(outputs, dim=1)
-            _, batch_predictions = torch.max(outputs, dim=1)
-            
-            for i, pred in enumerate(batch_predictions):
-                predicted_label = reverse_label_mapping.get(pred.item(), "Unknown")
-                confidence = probabilities[i][pred].item()
-                predictions.append(predicted_label)
-                confidences.append(confidence)
+    for start in range(0, len(texts), batch_size):
+        chunk = texts[start:start + batch_size]
+        for predicted_label, confidence, _ in predict_texts(model, tokenizer, chunk, reverse_label_mapping, max_len, device):
+            predictions.append(predicted_label)
+            confidences.append(confidence)
     
     return predictions, confidences
 
@@ -231,19 +430,30 @@ CORS(app)
 # Load model once when service starts
 print("🚀 Loading MedBERT model...")
 try:
-    model, tokenizer, label_mapping, config, device = load_trained_model("../../../saved_medbert_model")
+    model, tokenizer, label_mapping, reverse_label_mapping, config, device = load_trained_model("../../../saved_medbert_model")
     print("✅ MedBERT model loaded successfully!")
 except Exception as e:
     print(f"❌ Error loading model: {e}")
     exit(1)
 
+cuda_graphs = capture_cuda_graphs(model, device, config['max_len']) if USE_CUDA_GRAPHS else None
+
+batcher = DynamicBatcher(
+    lambda texts: predict_texts(model, tokenizer, texts, reverse_label_mapping, config['max_len'], device),
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_BATCH_WAIT_MS,
+)
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
         'model_loaded': True,
         'device': str(device),
-        'classes': list(label_mapping.keys())
+        'classes': list(label_mapping.keys()),
+        'prediction_cache': prediction_cache.stats()
     })
 
 @app.route('/predict', methods=['POST'])
@@ -255,12 +465,9 @@ def predict():
         if not text:
             return jsonify({'error': 'No text provided'}), 400
         
-        predicted_label, confidence, probabilities = predict_single(
-            model, tokenizer, text, label_mapping, config['max_len'], device
-        )
+        predicted_label, confidence, probabilities = prediction_cache.get_or_compute(text, batcher.predict)
         
-        reverse_mapping = {v: k for k, v in label_mapping.items()}
-        prob_dict = {reverse_mapping[i]: float(prob) for i, prob in enumerate(probabilities)}
+        prob_dict = {reverse_label_mapping[i]: float(prob) for i, prob in enumerate(probabilities)}
         
         return jsonify({
             'success': True,
@@ -268,7 +475,7 @@ def predict():
             'confidence': float(confidence),
             'probabilities': prob_dict,
             'text': text,
-            'timestamp': pd.Timestamp.now().isoformat()
+            'timestamp': datetime.now().isoformat()
         })
         
     except Exception as e:
@@ -290,7 +497,7 @@ def predict_batch_endpoint():
             return jsonify({'error': 'Batch size too large (max 100)'}), 400
         
         predictions, confidences = predict_batch(
-            model, tokenizer, texts, label_mapping, config['max_len'], device
+            model, tokenizer, texts, reverse_label_mapping, config['max_len'], device
         )
         
         results = []
@@ -13,6 +13,43 @@ import logging
 from typing import Optional
 import time
 import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from prediction_cache import PredictionCache
+
+# Optional Hyperscan multi-pattern scanner for PII detection
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Optional Aho-Corasick automaton for keyword matching
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Cache of predict_risk results keyed on the text hash (PREDICTION_CACHE_SIZE=0 to disable)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '10000'))
+
+# Size CPU parallelism to the machine: WORKERS is the number of server processes
+# (gunicorn -w), so thread pool threads x workers and torch threads x workers
+# both stay around the core count instead of oversubscribing it
+WORKERS = max(1, int(os.environ.get('WORKERS', '1')))
+CPU_COUNT = os.cpu_count() or 1
+torch.set_num_threads(max(1, CPU_COUNT // WORKERS))
+try:
+    torch.set_num_interop_threads(1)
+except RuntimeError:
+    pass  # already fixed once any parallel work has run
+
+# Shared pool for the blocking tokenizer/model/regex work in /analyze; threads
+# are started lazily, so creating it before gunicorn forks is safe
+executor = ThreadPoolExecutor(max_workers=max(1, CPU_COUNT // WORKERS), thread_name_prefix="analyze")
 
 # Configure logging
 logging.basicConfig(
@@ -46,11 +83,70 @@ PII_PATTERNS = {
     'address': re.compile(r'\b\d+\s+[A-Za-z\s]+(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Lane|Ln|Drive|Dr)\b', re.IGNORECASE),
 }
 
+PII_PATTERN_NAMES = list(PII_PATTERNS.keys())
+
+# Every PII pattern needs a digit except email, which needs '@'; the shortest
+# possible match is a 5-character address such as "1 xSt"
+DIGIT_RE = re.compile(r'\d')
+MIN_PII_LENGTH = 5
+
+def build_pii_database():
+    """
+    Compile all PII patterns into one Hyperscan database so text is scanned in a single pass.
+    Hyperscan's \b and \d are ASCII-only, so it is only used for ASCII text, where it agrees with re.
+    """
+    if not HYPERSCAN_AVAILABLE:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[p.pattern.encode() for p in PII_PATTERNS.values()],
+            ids=list(range(len(PII_PATTERNS))),
+            flags=[
+                hyperscan.HS_FLAG_SINGLEMATCH
+                | (hyperscan.HS_FLAG_CASELESS if p.flags & re.IGNORECASE else 0)
+                for p in PII_PATTERNS.values()
+            ],
+        )
+        return db
+    except Exception as e:
+        logger.warning(f"Could not compile Hyperscan PII database, using re: {e}")
+        return None
+
+PII_DATABASE = build_pii_database()
+
+# The database's built-in scratch space only supports one scan at a time and detect_pii
+# runs on several executor threads, so every thread scans with scratch of its own
+pii_scratch = threading.local()
+
 # Risk keywords for heuristic analysis
 BIAS_KEYWORDS = ['always', 'never', 'all', 'none', 'everyone', 'no one', 'must', 'only', 'absolutely']
 TOXICITY_KEYWORDS = ['hate', 'stupid', 'idiot', 'terrible', 'worst', 'awful', 'horrible']
 FRAUD_KEYWORDS = ['guaranteed', 'free money', 'limited time', 'act now', 'no risk', 'secret', 'urgent']
 
+KEYWORD_CATEGORIES = {
+    'bias': BIAS_KEYWORDS,
+    'toxicity': TOXICITY_KEYWORDS,
+    'fraud': FRAUD_KEYWORDS,
+}
+
+def build_keyword_automaton():
+    """Build one Aho-Corasick automaton over every heuristic keyword, tagged with its categories"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    keyword_categories = {}
+    for category, keywords in KEYWORD_CATEGORIES.items():
+        for keyword in keywords:
+            keyword_categories.setdefault(keyword, []).append(category)
+    automaton = ahocorasick.Automaton()
+    for keyword, categories in keyword_categories.items():
+        automaton.add_word(keyword, (keyword, tuple(categories)))
+    automaton.make_automaton()
+    return automaton
+
+KEYWORD_AUTOMATON = build_keyword_automaton()
+MIN_KEYWORD_LENGTH = min(len(k) for keywords in KEYWORD_CATEGORIES.values() for k in keywords)
+
 class RiskClassifier(nn.Module):
     """MedBERT-based risk classifier"""
     def __init__(self, n_classes, pre_trained_model):
@@ -66,44 +162,76 @@ class RiskClassifier(nn.Module):
 
 def detect_pii(text: str) -> bool:
     """Detect PII in text using regex patterns"""
+    if len(text) < MIN_PII_LENGTH:
+        return False
+    has_at = '@' in text
+    has_digit = DIGIT_RE.search(text) is not None
+    if not has_at and not has_digit:
+        return False
+    
+    if PII_DATABASE is not None and text.isascii():
+        matches = []
+        
+        def on_match(pattern_id, start, end, flags, context):
+            matches.append(pattern_id)
+            return True  # stop scanning at the first hit
+        
+        scratch = getattr(pii_scratch, 'scratch', None)
+        if scratch is None:
+            scratch = pii_scratch.scratch = hyperscan.Scratch(PII_DATABASE)
+        try:
+            PII_DATABASE.scan(text.encode(), match_event_handler=on_match, scratch=scratch)
+        except hyperscan.ScanTerminated:
+            pass
+        if matches:
+            logger.info(f"PII detected: {PII_PATTERN_NAMES[matches[0]]}")
+            return True
+        return False
+    
     for pattern_name, pattern in PII_PATTERNS.items():
+        if not (has_at if pattern_name == 'email' else has_digit):
+            continue
         if pattern.search(text):
             logger.info(f"PII detected: {pattern_name}")
             return True
     return False
 
-def analyze_bias(text: str) -> str:
-    """Analyze bias risk using keyword heuristics"""
-    text_lower = text.lower()
-    bias_count = sum(1 for keyword in BIAS_KEYWORDS if keyword in text_lower)
-    
-    if bias_count >= 3:
-        return "HIGH"
-    elif bias_count >= 1:
-        return "MEDIUM"
-    return "LOW"
+def count_keywords(text_lower: str) -> dict:
+    """Count distinct keywords per category (bias/toxicity/fraud) in one pass over the text"""
+    counts = dict.fromkeys(KEYWORD_CATEGORIES, 0)
+    if len(text_lower) < MIN_KEYWORD_LENGTH:
+        return counts
+    if KEYWORD_AUTOMATON is not None:
+        seen = set()
+        for _, (keyword, categories) in KEYWORD_AUTOMATON.iter(text_lower):
+            if keyword not in seen:
+                seen.add(keyword)
+                for category in categories:
+                    counts[category] += 1
+    else:
+        for category, keywords in KEYWORD_CATEGORIES.items():
+            counts[category] = sum(1 for keyword in keywords if keyword in text_lower)
+    return counts
 
-def analyze_toxicity(text: str) -> str:
-    """Analyze toxicity risk using keyword heuristics"""
-    text_lower = text.lower()
-    toxicity_count = sum(1 for keyword in TOXICITY_KEYWORDS if keyword in text_lower)
-    
-    if toxicity_count >= 2:
+def keyword_risk_level(count: int, high_threshold: int) -> str:
+    """Map a keyword count to LOW/MEDIUM/HIGH"""
+    if count >= high_threshold:
         return "HIGH"
-    elif toxicity_count >= 1:
+    elif count >= 1:
         return "MEDIUM"
     return "LOW"
 
-def analyze_fraud(text: str) -> str:
-    """Analyze fraud risk using keyword heuristics"""
-    text_lower = text.lower()
-    fraud_count = sum(1 for keyword in FRAUD_KEYWORDS if keyword in text_lower)
-    
-    if fraud_count >= 2:
-        return "HIGH"
-    elif fraud_count >= 1:
-        return "MEDIUM"
-    return "LOW"
+def analyze_keywords(text_lower: str) -> tuple:
+    """
+    Analyze bias, toxicity and fraud risk using keyword heuristics
+    Returns (bias_risk, toxicity_risk, fraud_risk)
+    """
+    counts = count_keywords(text_lower)
+    return (
+        keyword_risk_level(counts['bias'], 3),
+        keyword_risk_level(counts['toxicity'], 2),
+        keyword_risk_level(counts['fraud'], 2),
+    )
 
 def load_trained_model(model_dir="../../../saved_medbert_model"):
     """Load the trained MedBERT model from saved directory"""
@@ -149,12 +277,13 @@ def load_trained_model(model_dir="../../../saved_medbert_model"):
         # Return None values to signal we'll use heuristics only
         return None, None, default_config['label_mapping'], default_config['max_len'], device
 
-def predict_risk(model, tokenizer, text, label_mapping, max_len, device):
-    """Make a risk prediction on text using heuristics"""
+def predict_risk(model, tokenizer, text, label_mapping, max_len, device, text_lower=None):
+    """Make a risk prediction on text using heuristics (pass text_lower to reuse an existing lowercased copy)"""
     # Since we may not have a loaded model, use heuristic-based prediction
     
     # Analyze text length and complexity
-    text_lower = text.lower()
+    if text_lower is None:
+        text_lower = text.lower()
     text_length = len(text)
     
     # Heuristic risk calculation
@@ -208,24 +337,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global model variables
-model = None
-tokenizer = None
-label_mapping = None
-max_len = None
-device = None
-
-@app.on_event("startup")
-async def startup_event():
-    """Load model on startup"""
-    global model, tokenizer, label_mapping, max_len, device
-    try:
-        logger.info("🚀 Starting ML Service...")
-        model, tokenizer, label_mapping, max_len, device = load_trained_model()
-        logger.info("✅ ML Service ready!")
-    except Exception as e:
-        logger.error(f"❌ Failed to load model: {e}")
-        raise
+# Load the model at import time so that `gunicorn --preload` loads the weights
+# once in the master and the forked workers share them copy-on-write
+logger.info("🚀 Starting ML Service...")
+model, tokenizer, label_mapping, max_len, device = load_trained_model()
+logger.info("✅ ML Service ready!")
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE)
 
 @app.get("/")
 async def root():
@@ -243,6 +360,7 @@ async def health_check():
         "status": "healthy",
         "model_loaded": model is not None,
         "device": str(device),
+        "prediction_cache": prediction_cache.stats(),
         "timestamp": time.time()
     }
 
@@ -261,9 +379,21 @@ async def analyze(request: AnalyzeRequest):
         
         logger.info(f"Analyzing text (length: {len(text)} chars)")
         
-        # Run ML model prediction
-        ml_prediction, ml_confidence = predict_risk(
-            model, tokenizer, text, label_mapping, max_len, device
+        # Lowercase once; the ML heuristics and keyword scan share the copy
+        text_lower = text.lower()
+        
+        # Run the ML prediction and the CPU heuristics concurrently in the thread pool
+        loop = asyncio.get_running_loop()
+        ml_future = loop.run_in_executor(
+            executor,
+            prediction_cache.get_or_compute,
+            text,
+            lambda t: predict_risk(model, tokenizer, t, label_mapping, max_len, device, text_lower=text_lower),
+        )
+        pii_future = loop.run_in_executor(executor, detect_pii, text)
+        keywords_future = loop.run_in_executor(executor, analyze_keywords, text_lower)
+        (ml_prediction, ml_confidence), pii_detected, (bias_risk, toxicity_risk, fraud_risk) = await asyncio.gather(
+            ml_future, pii_future, keywords_future
         )
         
         # Map ML prediction to hallucination risk
@@ -274,12 +404,6 @@ async def analyze(request: AnalyzeRequest):
         else:
             hallucination_risk = hallucination_risk.replace("_RISK", "")
         
-        # Run heuristic analyses
-        pii_detected = detect_pii(text)
-        bias_risk = analyze_bias(text)
-        toxicity_risk = analyze_toxicity(text)
-        fraud_risk = analyze_fraud(text)
-        
         # Calculate processing time
         processing_time = (time.time() - start_time) * 1000
         
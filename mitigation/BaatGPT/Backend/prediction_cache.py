@@ -0,0 +1,57 @@
+"""
+Prediction cache for the MedBERT services
+Bounded LRU cache keyed on a hash of the input text
+"""
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+
+
+class PredictionCache:
+    """
+    LRU cache of prediction results keyed on blake2b(text).
+
+    Retries and duplicate prompts skip the model entirely. Keys are 16-byte
+    digests, so memory is bounded by `max_size` entries regardless of how long
+    the cached texts were. A `max_size` of 0 disables caching.
+    """
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text):
+        return blake2b(text.encode(), digest_size=16).digest()
+
+    def get_or_compute(self, text, compute):
+        """Return the cached result for `text`, calling `compute(text)` on a miss"""
+        if self.max_size <= 0:
+            return compute(text)
+        key = self.key(text)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        value = compute(text)
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def stats(self):
+        """Size and hit rate, for the /health endpoints"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._cache),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
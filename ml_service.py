@@ -7,22 +7,94 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import re
+import json
 import logging
 import time
-from typing import Optional
+from typing import Any, List, Optional
 import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left
+from collections import deque, OrderedDict
+from dataclasses import dataclass
+from hashlib import blake2b
+import importlib.util
+
+# Optional Hyperscan multi-pattern scanner for PII detection
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Optional Aho-Corasick automaton for keyword matching
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Optional orjson for serializing responses in C (falls back to the stdlib json encoder).
+# ORJSONResponse imports without orjson and only fails when a response is sent, so check up front
+if importlib.util.find_spec('orjson') is not None:
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+else:
+    from fastapi.responses import JSONResponse as DefaultResponse
+
+# Texts are tokenized one at a time on the executor threads and gunicorn forks
+# workers after preload, so the Rust tokenizer's own thread pool stays off
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
 
 # Try to import ML dependencies
 try:
     import torch
     import torch.nn as nn
-    from transformers import BertTokenizer, BertModel
+    from transformers import BertTokenizerFast, BertModel
+    from safetensors import safe_open
     ML_AVAILABLE = True
 except ImportError:
     ML_AVAILABLE = False
     logger_temp = logging.getLogger(__name__)
     logger_temp.warning("ML dependencies not available, will use heuristics only")
 
+# Batch-1 CPU inference thrashes cores when PyTorch spreads tiny matmuls over every
+# thread; default to one intra-op thread per process (TORCH_NUM_THREADS to override)
+TORCH_NUM_THREADS = int(os.environ.get('TORCH_NUM_THREADS', '1'))
+if ML_AVAILABLE:
+    torch.set_num_threads(TORCH_NUM_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # can only be set before any inter-op parallel work has started
+    # Inference-only service. Grad mode is per-thread, so the forward passes
+    # keep their own inference_mode blocks for threads other than the main one.
+    torch.set_grad_enabled(False)
+
+# Optional ONNX Runtime backend (export the model first with export_model.py)
+try:
+    import numpy as np
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+# Dynamic INT8 quantization of the Linear layers when serving PyTorch on CPU (USE_INT8=0 to disable)
+USE_INT8 = os.environ.get('USE_INT8', '1') == '1'
+
+# Prefer FBGEMM (x86 AVX2/VNNI) kernels for the quantized Linear layers, QNNPACK on ARM
+if ML_AVAILABLE:
+    if 'fbgemm' in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = 'fbgemm'
+    elif 'qnnpack' in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = 'qnnpack'
+
+# torch.compile the classifier at load time (USE_TORCH_COMPILE=1 to enable)
+USE_TORCH_COMPILE = os.environ.get('USE_TORCH_COMPILE', '0') == '1'
+
+# TorchScript-trace and freeze the PyTorch classifier at load time when it is not compiled (USE_TORCHSCRIPT=0 to disable)
+USE_TORCHSCRIPT = os.environ.get('USE_TORCHSCRIPT', '1') == '1'
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -61,7 +133,8 @@ app = FastAPI(
     contact={
         "name": "AI Risk Mitigation System",
         "url": "https://github.com/jiya2401/AI-RISK-MITIGATION-SYSTEM"
-    }
+    },
+    default_response_class=DefaultResponse
 )
 
 # Configure CORS - for production, restrict to specific origins
@@ -76,6 +149,9 @@ app.add_middleware(
 class TextRequest(BaseModel):
     text: str
 
+class BatchTextRequest(BaseModel):
+    texts: List[str]
+
 class AnalysisResponse(BaseModel):
     hallucination_risk: str
     bias_risk: str
@@ -103,17 +179,194 @@ if ML_AVAILABLE:
             output = self.drop(output.last_hidden_state[:, 0, :])
             return self.out(output)
 
-# Global model variables
-medbert_model = None
-tokenizer = None
-device = None
-label_mapping = None
-max_len = 512
-model_loaded = False
+if ONNXRUNTIME_AVAILABLE:
+    class OnnxRiskClassifier:
+        """
+        ONNX Runtime session with the same call signature as RiskClassifier.
+        On CUDA, inputs and logits stay on the GPU via IOBinding.
+        """
+        def __init__(self, onnx_path, device):
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            providers = ['CPUExecutionProvider']
+            if device.type == 'cuda':
+                providers.insert(0, 'CUDAExecutionProvider')
+            self.session = ort.InferenceSession(onnx_path, options, providers=providers)
+            self.use_io_binding = 'CUDAExecutionProvider' in self.session.get_providers()
+            self.n_classes = self.session.get_outputs()[0].shape[1]
+
+        def eval(self):
+            return self
+
+        def __call__(self, input_ids, attention_mask):
+            if not self.use_io_binding:
+                logits, = self.session.run(None, {
+                    'input_ids': input_ids.cpu().numpy(),
+                    'attention_mask': attention_mask.cpu().numpy(),
+                })
+                return torch.from_numpy(logits)
+            
+            input_ids = input_ids.contiguous()
+            attention_mask = attention_mask.contiguous()
+            logits = torch.empty((input_ids.shape[0], self.n_classes), dtype=torch.float32, device=input_ids.device)
+            device_id = input_ids.device.index or 0
+            binding = self.session.io_binding()
+            binding.bind_input('input_ids', 'cuda', device_id, np.int64, tuple(input_ids.shape), input_ids.data_ptr())
+            binding.bind_input('attention_mask', 'cuda', device_id, np.int64, tuple(attention_mask.shape), attention_mask.data_ptr())
+            binding.bind_output('logits', 'cuda', device_id, np.float32, tuple(logits.shape), logits.data_ptr())
+            # The inputs were staged with non_blocking copies on torch's stream, which
+            # ONNX Runtime does not wait on: finish them before the session reads the buffers
+            torch.cuda.current_stream(input_ids.device).synchronize()
+            self.session.run_with_iobinding(binding)
+            return logits
+
+def load_onnx_classifier(model_dir, device):
+    """
+    Open an exported ONNX model if there is one: the INT8 model on CPU, the FP32 model on CUDA
+    Returns None when ONNX Runtime or the exported file is unavailable
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        return None
+    candidates = ["model.onnx"] if device.type == 'cuda' else ["model.int8.onnx", "model.onnx"]
+    for filename in candidates:
+        onnx_path = os.path.join(model_dir, filename)
+        if os.path.exists(onnx_path):
+            try:
+                classifier = OnnxRiskClassifier(onnx_path, device)
+                logger.info(f"Serving MedBERT through ONNX Runtime ({onnx_path})")
+                return classifier
+            except Exception as e:
+                logger.warning(f"Could not open {onnx_path} with ONNX Runtime: {e}")
+    return None
+
+@dataclass(frozen=True, slots=True)
+class ModelBundle:
+    """Everything the request path needs from a loaded MedBERT model"""
+    model: Any
+    tokenizer: Any
+    device: Any
+    reverse_label_mapping: dict
+    max_len: int
+
+# The loader builds the bundle completely and publishes it with a single
+# assignment; request code reads model_bundle once and uses that snapshot,
+# so it never sees a half-loaded model. None until MedBERT is ready.
+model_bundle: Optional[ModelBundle] = None
+
+# Texts shorter than this many words skip MedBERT and use the heuristics alone
+MIN_BERT_WORDS = int(os.environ.get('MIN_BERT_WORDS', '5'))
+
+def needs_medbert(text: str) -> bool:
+    """Whether MedBERT should run on this text: the model is loaded and the text is long enough to classify"""
+    return model_bundle is not None and text.count(' ') + 1 >= MIN_BERT_WORDS
+
+# Dynamic batching: concurrent /analyze requests share one MedBERT forward pass
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '32'))
+MAX_BATCH_DELAY_MS = float(os.environ.get('MAX_BATCH_DELAY_MS', '5'))
+
+# Requests are queued per token-length bucket so a batch only pads up to its bucket
+LENGTH_BUCKETS = (32, 64, 128, 256, 512)
+bucket_queues = None  # one deque of (input_ids, Future, enqueue_time) per bucket, created at startup
+batch_ready = None  # asyncio.Event set whenever a request is queued
+batch_worker_task = None  # the running batch_worker(), kept referenced so it is not garbage collected
+
+# Blocking work runs off the event loop: one thread owns the model (every forward
+# pass, batched or not, is submitted to it), and a CPU-sized pool runs tokenization
+# and the heuristics.
+# WORKERS is the number of server processes (gunicorn -w), so the pool threads
+# across all workers stay around the core count
+WORKERS = max(1, int(os.environ.get('WORKERS', '1')))
+model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="medbert")
+cpu_executor = ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 1) // WORKERS), thread_name_prefix="heuristics")
+
+# Texts up to this many characters that skip MedBERT run the heuristics on the event
+# loop: scanning them is cheaper than handing them to cpu_executor and back
+INLINE_HEURISTICS_MAX_CHARS = int(os.environ.get('INLINE_HEURISTICS_MAX_CHARS', '128'))
+
+def bucket_length(length: int, max_len: int) -> int:
+    """Round a token count up to its length bucket (capped at max_len)"""
+    index = bisect_left(LENGTH_BUCKETS, length)
+    return min(LENGTH_BUCKETS[index], max_len) if index < len(LENGTH_BUCKETS) else max_len
+
+def compile_medbert(model, device, max_len, warmup_steps=4):
+    """
+    torch.compile the classifier and warm it up at every bucket length, with one and
+    two texts so the batch dimension is compiled as dynamic before serving,
+    falling back to the eager model if compilation fails
+    """
+    try:
+        # Graph breaks are allowed: the dynamically quantized INT8 Linear layers
+        # cannot be traced into a full graph
+        compiled = torch.compile(model, mode='reduce-overhead', fullgraph=False)
+        lengths = sorted({bucket_length(length, max_len) for length in LENGTH_BUCKETS} | {max_len})
+        # Inputs are created outside inference mode, like the tokenizer's tensors, and ids
+        # and mask are separate tensors: inference tensors (different dispatch keys) or one
+        # tensor passed twice (an aliasing guard) would not match the real inputs' guards
+        dummy_inputs = [(torch.ones((rows, length), dtype=torch.long, device=device),
+                         torch.ones((rows, length), dtype=torch.long, device=device))
+                        for length in lengths for rows in (1, 2)]
+        with torch.inference_mode():
+            for dummy_ids, dummy_mask in dummy_inputs:
+                for _ in range(warmup_steps):
+                    compiled(input_ids=dummy_ids, attention_mask=dummy_mask)
+        logger.info(f"Compiled MedBERT with torch.compile (warmed up at lengths {lengths})")
+        return compiled
+    except Exception as e:
+        logger.warning(f"torch.compile failed, using eager model: {e}")
+        return model
+
+def trace_medbert(model, device, max_len):
+    """
+    TorchScript-trace and freeze the classifier, checking the traced graph against
+    the eager model at another batch size and sequence length (with padding) before
+    using it; falls back to the eager model if tracing fails or the outputs differ
+    """
+    try:
+        example_ids = torch.ones((2, min(max_len, 32)), dtype=torch.long, device=device)
+        example_mask = torch.ones_like(example_ids)
+        example_mask[1, example_ids.shape[1] // 2:] = 0  # trace the padded-batch path
+        with torch.no_grad():
+            traced = torch.jit.freeze(torch.jit.trace(model, (example_ids, example_mask), strict=False))
+            try:
+                traced = torch.jit.optimize_for_inference(traced)
+            except Exception as e:
+                logger.info(f"optimize_for_inference skipped: {e}")
+        
+        check_ids = torch.ones((3, min(max_len, 48)), dtype=torch.long, device=device)
+        check_mask = torch.ones_like(check_ids)
+        check_mask[2, check_ids.shape[1] // 3:] = 0
+        with torch.inference_mode():
+            expected = model(input_ids=check_ids, attention_mask=check_mask)
+            actual = traced(input_ids=check_ids, attention_mask=check_mask)
+        if not torch.allclose(expected.float(), actual.float(), atol=1e-4):
+            logger.warning("TorchScript trace disagrees with the eager model, using eager model")
+            return model
+        logger.info("Traced MedBERT with TorchScript")
+        return traced
+    except Exception as e:
+        logger.warning(f"TorchScript tracing failed, using eager model: {e}")
+        return model
+
+def load_safetensors_checkpoint(path, device):
+    """
+    Memory-map classifier_weights.safetensors (see load_model.convert_checkpoint_to_safetensors),
+    returning the same dict layout as the .pth checkpoint
+    """
+    with safe_open(path, framework='pt', device=str(device)) as f:
+        metadata = f.metadata() or {}
+        state_dict = {key: f.get_tensor(key) for key in f.keys()}
+    checkpoint = {'model_state_dict': state_dict}
+    if 'label_mapping' in metadata:
+        checkpoint['label_mapping'] = json.loads(metadata['label_mapping'])
+    if 'num_classes' in metadata:
+        checkpoint['num_classes'] = int(metadata['num_classes'])
+    if 'model_config' in metadata:
+        checkpoint['model_config'] = json.loads(metadata['model_config'])
+    return checkpoint
 
 def load_medbert_model(model_dir="saved_medbert_model"):
     """Load MedBERT model at startup"""
-    global medbert_model, tokenizer, device, label_mapping, max_len, model_loaded
+    global model_bundle
     
     if not ML_AVAILABLE:
         logger.warning("ML dependencies not available, using heuristics only")
@@ -128,9 +381,12 @@ def load_medbert_model(model_dir="saved_medbert_model"):
             logger.warning(f"Model directory {model_dir} not found, using heuristics")
             return False
         
-        # Try to load checkpoint
+        # Try to load checkpoint (memory-mapped safetensors preferred over the pickle)
+        safetensors_path = os.path.join(model_dir, "classifier_weights.safetensors")
         checkpoint_path = os.path.join(model_dir, "classifier_weights.pth")
-        if not os.path.exists(checkpoint_path):
+        if os.path.exists(safetensors_path) and os.path.getsize(safetensors_path) >= 1000:
+            checkpoint_path = safetensors_path
+        elif not os.path.exists(checkpoint_path):
             logger.warning(f"Checkpoint file not found at {checkpoint_path}, using heuristics")
             return False
         
@@ -141,10 +397,15 @@ def load_medbert_model(model_dir="saved_medbert_model"):
             return False
         
         # Load checkpoint
-        checkpoint = torch.load(checkpoint_path, map_location=device, weights_only=False)
+        if checkpoint_path == safetensors_path:
+            checkpoint = load_safetensors_checkpoint(safetensors_path, device)
+        else:
+            checkpoint = torch.load(checkpoint_path, map_location=device, weights_only=False)
+        logger.info(f"Loaded checkpoint from {checkpoint_path}")
         
         # Extract configuration
         label_mapping = checkpoint.get('label_mapping', {'Low Risk': 0, 'Medium Risk': 1, 'High Risk': 2})
+        reverse_label_mapping = {v: k for k, v in label_mapping.items()}
         num_classes = checkpoint.get('num_classes', 3)
         model_config = checkpoint.get('model_config', {'max_len': 512})
         max_len = model_config.get('max_len', 512)
@@ -154,14 +415,14 @@ def load_medbert_model(model_dir="saved_medbert_model"):
         
         # Try to load tokenizer from local directory
         try:
-            tokenizer = BertTokenizer.from_pretrained(model_dir, local_files_only=True)
+            tokenizer = BertTokenizerFast.from_pretrained(model_dir, local_files_only=True)
             logger.info("Loaded tokenizer from local directory")
         except Exception as e:
             logger.warning(f"Could not load tokenizer from local directory: {e}")
             # Try loading from saved vocab.txt
             vocab_path = os.path.join(model_dir, "vocab.txt")
             if os.path.exists(vocab_path) and os.path.getsize(vocab_path) > 1000:
-                tokenizer = BertTokenizer(vocab_file=vocab_path)
+                tokenizer = BertTokenizerFast(vocab_file=vocab_path)
                 logger.info("Loaded tokenizer from vocab.txt")
             else:
                 logger.warning("Could not load tokenizer, using heuristics")
@@ -189,8 +450,27 @@ def load_medbert_model(model_dir="saved_medbert_model"):
         medbert_model = medbert_model.to(device)
         medbert_model.eval()
         
+        onnx_classifier = load_onnx_classifier(model_dir, device)
+        if onnx_classifier is not None:
+            medbert_model = onnx_classifier
+        elif device.type == 'cpu' and USE_INT8:
+            medbert_model = torch.quantization.quantize_dynamic(medbert_model, {nn.Linear}, dtype=torch.qint8)
+            logger.info("Applied dynamic INT8 quantization to Linear layers")
+        
+        if USE_TORCH_COMPILE and onnx_classifier is None:
+            medbert_model = compile_medbert(medbert_model, device, max_len)
+        elif USE_TORCHSCRIPT and onnx_classifier is None:
+            medbert_model = trace_medbert(medbert_model, device, max_len)
+        
+        model_bundle = ModelBundle(
+            model=medbert_model,
+            tokenizer=tokenizer,
+            device=device,
+            reverse_label_mapping=reverse_label_mapping,
+            max_len=max_len,
+        )
         logger.info("✅ MedBERT model loaded successfully!")
-        model_loaded = True
+        analysis_cache.clear()  # drop heuristics-only results cached before the model was ready
         return True
         
     except Exception as e:
@@ -200,85 +480,489 @@ def load_medbert_model(model_dir="saved_medbert_model"):
         traceback.print_exc()
         return False
 
+staging_buffers = threading.local()
+
+def to_device(input_ids, attention_mask, device, max_len):
+    """
+    Move a tokenized batch to the model device. On CUDA the ids and mask are
+    copied into per-thread pinned host and device buffers that are reused across
+    requests, so the host-to-device copy is asynchronous and allocation-free.
+    """
+    if device.type != 'cuda':
+        return input_ids, attention_mask
+    rows, length = input_ids.shape
+    numel = 2 * rows * length
+    buffers = getattr(staging_buffers, 'buffers', None)
+    if buffers is None or buffers[0].numel() < numel:
+        capacity = max(numel, 2 * MAX_BATCH_SIZE * max_len)
+        buffers = (
+            torch.empty(capacity, dtype=torch.long, pin_memory=True),
+            torch.empty(capacity, dtype=torch.long, device=device),
+        )
+        staging_buffers.buffers = buffers
+    host = buffers[0][:numel].view(2, rows, length)
+    host[0].copy_(input_ids)
+    host[1].copy_(attention_mask)
+    staged = buffers[1][:numel].view(2, rows, length)
+    staged.copy_(host, non_blocking=True)
+    return staged[0], staged[1]
+
 def predict_with_medbert(text: str):
-    """Make prediction using MedBERT model"""
-    if not model_loaded or medbert_model is None or tokenizer is None:
-        return None, None, None
+    """
+    Make prediction using MedBERT model
+    The text is not padded to max_len: it runs at its own token length, or at its
+    length bucket when the model is compiled for fixed shapes
+    """
+    return predict_with_medbert_batch([text])[0]
+
+def predict_tokenized_batch(input_ids: list, bundle: Optional[ModelBundle] = None) -> list:
+    """
+    Run MedBERT on several pre-tokenized texts in one forward pass, padding to the longest
+    Returns a (label, confidence, second_probability) tuple per text, where
+    second_probability is the runner-up class probability (None with a single class)
+    """
+    if bundle is None:
+        bundle = model_bundle
+    if bundle is None:
+        return [(None, None, None)] * len(input_ids)
     
     try:
-        medbert_model.eval()
-        reverse_label_mapping = {v: k for k, v in label_mapping.items()}
-        
-        # Prepare input
-        encoding = tokenizer.encode_plus(
-            text,
-            add_special_tokens=True,
-            max_length=max_len,
-            return_token_type_ids=False,
-            padding='max_length',
-            truncation=True,
+        # A compiled model only sees the warmed-up bucket shapes; otherwise pad to the longest text
+        if USE_TORCH_COMPILE:
+            padding, pad_length = 'max_length', bucket_length(max(len(ids) for ids in input_ids), bundle.max_len)
+        else:
+            padding, pad_length = 'longest', None
+        encoding = bundle.tokenizer.pad(
+            {'input_ids': input_ids},
+            padding=padding,
+            max_length=pad_length,
             return_attention_mask=True,
             return_tensors='pt',
         )
         
-        input_ids = encoding['input_ids'].to(device)
-        attention_mask = encoding['attention_mask'].to(device)
+        batch_input_ids, attention_mask = to_device(
+            encoding['input_ids'], encoding['attention_mask'], bundle.device, bundle.max_len
+        )
         
-        # Make prediction
-        with torch.no_grad():
-            outputs = medbert_model(input_ids=input_ids, attention_mask=attention_mask)
+        with torch.inference_mode():
+            outputs = bundle.model(input_ids=batch_input_ids, attention_mask=attention_mask)
             probabilities = torch.softmax(outputs, dim=1)
-            _, prediction = torch.max(outputs, dim=1)
-            confidence = probabilities[0][prediction].item()
+            confidences, predictions = probabilities.max(dim=1)
+            # Only the runner-up probability is consumed (for bias risk), so copy
+            # back two floats per text instead of the full probability rows
+            if probabilities.shape[1] > 1:
+                second_probabilities = probabilities.topk(2, dim=1).values[:, 1].tolist()
+            else:
+                second_probabilities = [None] * probabilities.shape[0]
         
-        predicted_label = reverse_label_mapping.get(prediction.item(), "Medium Risk")
+        return [
+            (bundle.reverse_label_mapping.get(pred, "Medium Risk"), conf, second)
+            for pred, conf, second in zip(predictions.tolist(), confidences.tolist(), second_probabilities)
+        ]
         
-        return predicted_label, confidence, probabilities[0].cpu().numpy()
+    except Exception as e:
+        logger.error(f"MedBERT batch prediction error: {e}")
+        return [(None, None, None)] * len(input_ids)
+
+def tokenize_for_medbert(bundle: ModelBundle, text):
+    """Token ids for one text (or a list of texts), truncated to max_len and not padded"""
+    return bundle.tokenizer(
+        text,
+        add_special_tokens=True,
+        max_length=bundle.max_len,
+        truncation=True,
+        return_token_type_ids=False,
+        return_attention_mask=False,
+    )['input_ids']
+
+def predict_with_medbert_batch(texts: list) -> list:
+    """Tokenize several texts and run them through MedBERT in one forward pass"""
+    bundle = model_bundle
+    if bundle is None:
+        return [(None, None, None)] * len(texts)
+    try:
+        input_ids = tokenize_for_medbert(bundle, texts)
+    except Exception as e:
+        logger.error(f"MedBERT tokenization error: {e}")
+        return [(None, None, None)] * len(texts)
+    return predict_tokenized_batch(input_ids, bundle)
+
+def next_ready_bucket(start: int, now: float, max_wait: float) -> Optional[int]:
+    """Round-robin from `start` to the first bucket that is full or whose oldest request has waited max_wait"""
+    for offset in range(len(bucket_queues)):
+        index = (start + offset) % len(bucket_queues)
+        queue = bucket_queues[index]
+        if queue and (len(queue) >= MAX_BATCH_SIZE or now - queue[0][2] >= max_wait):
+            return index
+    return None
+
+async def batch_worker():
+    """Flush one length bucket at a time, as soon as it is full or its oldest request times out"""
+    loop = asyncio.get_running_loop()
+    max_wait = MAX_BATCH_DELAY_MS / 1000.0
+    next_bucket = 0
+    while True:
+        if not any(bucket_queues):
+            batch_ready.clear()
+            await batch_ready.wait()
         
+        now = loop.time()
+        index = next_ready_bucket(next_bucket, now, max_wait)
+        if index is None:
+            # Sleep until the oldest pending request times out, or a new one arrives
+            oldest = min(queue[0][2] for queue in bucket_queues if queue)
+            batch_ready.clear()
+            try:
+                await asyncio.wait_for(batch_ready.wait(), timeout=max(0.0, oldest + max_wait - now))
+            except asyncio.TimeoutError:
+                pass
+            continue
+        
+        next_bucket = (index + 1) % len(bucket_queues)
+        queue = bucket_queues[index]
+        batch = [queue.popleft() for _ in range(min(len(queue), MAX_BATCH_SIZE))]
+        
+        try:
+            results = await loop.run_in_executor(
+                model_executor, predict_tokenized_batch, [input_ids for input_ids, _, _ in batch]
+            )
+        except Exception as e:
+            # Fail this batch's requests and keep serving the others
+            logger.error(f"MedBERT batch worker error: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+def batch_worker_done(task: asyncio.Task):
+    """If the batch worker stops, fail the requests still queued instead of leaving them waiting"""
+    if task.cancelled():
+        error = asyncio.CancelledError()
+    else:
+        error = task.exception()
+        if error is None:
+            return
+        logger.error(f"MedBERT batch worker stopped: {error}")
+    for queue in bucket_queues:
+        while queue:
+            _, future, _ = queue.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+async def submit_to_medbert(text: str):
+    """Tokenize a text, queue it in its length bucket and wait for its MedBERT prediction"""
+    loop = asyncio.get_running_loop()
+    bundle = model_bundle
+    if bucket_queues is None or bundle is None or batch_worker_task.done():
+        return await loop.run_in_executor(model_executor, predict_with_medbert, text)
+    try:
+        input_ids = await loop.run_in_executor(cpu_executor, tokenize_for_medbert, bundle, text)
     except Exception as e:
-        logger.error(f"MedBERT prediction error: {e}")
+        logger.error(f"MedBERT tokenization error: {e}")
         return None, None, None
-
-def detect_pii(text: str) -> bool:
-    """Detect personally identifiable information using regex patterns"""
-    patterns = [
-        r'\b\d{3}-\d{2}-\d{4}\b',  # SSN
-        r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',  # Phone numbers
-        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',  # Email
-        r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b',  # Credit card
-        r'\b\d{5}(-\d{4})?\b',  # ZIP codes
-        r'\b\d{9}\b',  # SSN without dashes
-    ]
     
-    for pattern in patterns:
-        if re.search(pattern, text):
+    future = loop.create_future()
+    index = min(bisect_left(LENGTH_BUCKETS, len(input_ids)), len(LENGTH_BUCKETS) - 1)
+    bucket_queues[index].append((input_ids, future, loop.time()))
+    batch_ready.set()
+    return await future
+
+# Regex patterns, compiled once at import
+PII_PATTERNS = [
+    re.compile(r'\b\d{3}-\d{2}-\d{4}\b'),  # SSN
+    re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'),  # Phone numbers
+    re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),  # Email
+    re.compile(r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b'),  # Credit card
+    re.compile(r'\b\d{5}(-\d{4})?\b'),  # ZIP codes
+    re.compile(r'\b\d{9}\b'),  # SSN without dashes
+]
+
+# Offensive patterns
+OFFENSIVE_PATTERNS = [
+    re.compile(r'\b(hate|hating|hated)\s+\w+'),
+    re.compile(r'\b(terrible|awful|horrible)\s+(and|or)\s+\w+'),
+    re.compile(r'\b(stupid|dumb|idiotic)\s+\w+'),
+]
+
+# Unsupported claim patterns
+UNSUPPORTED_CLAIM_PATTERNS = [
+    re.compile(r'research shows that \w+'),
+    re.compile(r'studies prove that \w+'),
+    re.compile(r'scientists discovered that \w+'),
+    re.compile(r'\d+% of (people|users|patients)'),
+    re.compile(r'(always|never) (works|fails|happens)'),
+]
+
+# Specific numeric claims (percentages and decimals)
+NUMERIC_CLAIM_PATTERN = re.compile(r'\d+%|\d+\.\d+')
+
+# Absolute statements
+ABSOLUTE_PATTERNS = [
+    re.compile(r'\b(all|every|none|no)\s+\w+\s+(are|is|have|has)'),
+    re.compile(r'\b(always|never)\s+\w+'),
+    re.compile(r'\b(everyone|nobody)\s+(knows|believes|thinks)'),
+]
+
+def build_pattern_union(patterns: list) -> re.Pattern:
+    """
+    Combine patterns into one regex that reports which of them match, so the text
+    is scanned once. Each pattern sits in a zero-width lookahead group, so overlapping
+    matches of different patterns are all seen (the patterns in each list start
+    with different words, so two never compete for the same position).
+    """
+    return re.compile('|'.join(f'(?=(?P<p{i}>{p.pattern}))' for i, p in enumerate(patterns)))
+
+def count_matching_patterns(union: re.Pattern, n_patterns: int, text: str, limit: Optional[int] = None,
+                            database=None) -> int:
+    """
+    Number of distinct patterns in a union that match somewhere in text
+    Stops scanning once limit patterns (default: all of them) have matched
+    database is the patterns' Hyperscan database, used instead of the union for ASCII text
+    """
+    if limit is None or limit > n_patterns:
+        limit = n_patterns
+    if limit <= 0:
+        return 0
+    matched = set()
+    if database is not None and text.isascii():
+        def on_match(pattern_id, start, end, flags, context):
+            matched.add(pattern_id)
+            return len(matched) >= limit  # a truthy return ends the scan
+        try:
+            scan_database(database, text.encode(), on_match)
+        except hyperscan.ScanTerminated:
+            pass
+        return len(matched)
+    for match in union.finditer(text):
+        matched.add(match.lastgroup)
+        if len(matched) >= limit:
+            break
+    return len(matched)
+
+def count_matches(pattern: re.Pattern, text: str, limit: int) -> int:
+    """Count non-overlapping matches of pattern in text, stopping once limit is reached"""
+    count = 0
+    for _ in pattern.finditer(text):
+        count += 1
+        if count >= limit:
+            break
+    return count
+
+# Single-pass unions of the pattern lists above
+PII_UNION = re.compile('|'.join(f'(?:{p.pattern})' for p in PII_PATTERNS))
+OFFENSIVE_UNION = build_pattern_union(OFFENSIVE_PATTERNS)
+UNSUPPORTED_CLAIM_UNION = build_pattern_union(UNSUPPORTED_CLAIM_PATTERNS)
+ABSOLUTE_UNION = build_pattern_union(ABSOLUTE_PATTERNS)
+
+# High risk fraud keywords
+FRAUD_HIGH_RISK_KEYWORDS = [
+    'guaranteed', 'act now', 'limited time', 'risk-free',
+    'click here now', 'urgent action', 'winner', 'claim your prize',
+    'congratulations you won', 'free money', 'no risk', 'double your',
+    'best price guaranteed', 'lowest price ever', 'cheapest rate',
+    'absolutely free', 'definitely safe', 'without any doubt',
+    'everyone agrees', '100% proven', 'zero risk', 'instant approval'
+]
+
+# Medium risk fraud keywords
+FRAUD_MEDIUM_RISK_KEYWORDS = [
+    'offer', 'deal', 'discount', 'special', 'promotion',
+    'exclusive', 'limited', 'hurry', 'bonus', 'sale',
+    'opportunity', 'claim now', 'expires soon'
+]
+
+# High toxicity keywords
+TOXIC_KEYWORDS = [
+    'hate', 'stupid', 'idiot', 'moron', 'dumb',
+    'pathetic', 'worthless', 'disgusting', 'garbage',
+    'trash', 'awful', 'horrible', 'terrible', 'worst'
+]
+
+# Indicators of high confidence/certainty (potential hallucination)
+CERTAINTY_PHRASES = [
+    'definitely', 'certainly', 'absolutely', 'without doubt',
+    'for sure', 'guaranteed', 'proven fact', 'scientific fact',
+    'everyone knows', 'it is known that', 'studies show that',
+    'experts agree', 'always', 'never', '100%', 'all scientists'
+]
+
+# Vague or hedging phrases (lower hallucination risk)
+HEDGING_PHRASES = [
+    'might', 'could', 'possibly', 'perhaps', 'may',
+    'likely', 'probably', 'seems', 'appears', 'suggests',
+    'according to', 'some sources', 'it is believed'
+]
+
+# Bias indicators
+BIAS_KEYWORDS = [
+    'obviously', 'clearly', 'it is clear that', 'everyone knows',
+    'no one would', 'any reasonable person', 'common sense',
+    'just', 'simply', 'merely', 'only', 'always better',
+    'never appropriate', 'all experts', 'every study'
+]
+
+FRAUD_KEYWORD_CATEGORIES = {'high': FRAUD_HIGH_RISK_KEYWORDS, 'medium': FRAUD_MEDIUM_RISK_KEYWORDS}
+TOXICITY_KEYWORD_CATEGORIES = {'toxic': TOXIC_KEYWORDS}
+HALLUCINATION_KEYWORD_CATEGORIES = {'certainty': CERTAINTY_PHRASES, 'hedging': HEDGING_PHRASES}
+BIAS_KEYWORD_CATEGORIES = {'bias': BIAS_KEYWORDS}
+
+# Weight of each signal in the hallucination risk score
+HALLUCINATION_WEIGHTS = {'certainty': 2, 'unsupported': 1, 'hedging': -1}
+
+# Keywords match whole words only: "hate" counts in "i hate this" but not in "whatever".
+# Single-word keywords are looked up in the set of words in the text; phrases and
+# keywords with punctuation ("act now", "risk-free", "100%") are matched as substrings
+# that do not start or end inside a word.
+WORD_RE = re.compile(r'\w+')
+
+def is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+def split_keywords(categories: dict) -> tuple:
+    """Split each category into a frozenset of single-word keywords and a tuple of phrases"""
+    words = {category: frozenset(k for k in keywords if WORD_RE.fullmatch(k)) for category, keywords in categories.items()}
+    phrases = {category: tuple(k for k in keywords if not WORD_RE.fullmatch(k)) for category, keywords in categories.items()}
+    return words, phrases
+
+def compile_phrase_pattern(phrase: str):
+    """Regex for a phrase that cannot start or end inside a word (fallback without Aho-Corasick)"""
+    prefix = r'(?<!\w)' if is_word_char(phrase[0]) else ''
+    suffix = r'(?!\w)' if is_word_char(phrase[-1]) else ''
+    return re.compile(prefix + re.escape(phrase) + suffix)
+
+def build_keyword_automaton(categories: dict):
+    """Build one Aho-Corasick automaton over every phrase in `categories`, tagged with its categories"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    keyword_categories = {}
+    for category, keywords in categories.items():
+        for keyword in keywords:
+            keyword_categories.setdefault(keyword, []).append(category)
+    automaton = ahocorasick.Automaton()
+    for keyword, keyword_cats in keyword_categories.items():
+        automaton.add_word(keyword, (keyword, tuple(keyword_cats)))
+    automaton.make_automaton()
+    return automaton
+
+def count_keywords(automaton, categories: dict, text_lower: str) -> dict:
+    """
+    Count distinct phrases per category that occur in text_lower on word boundaries,
+    in one pass over the text when an automaton is available
+    """
+    counts = dict.fromkeys(categories, 0)
+    if automaton is None:
+        for category, keywords in categories.items():
+            counts[category] = sum(1 for keyword in keywords if PHRASE_PATTERNS[keyword].search(text_lower))
+        return counts
+    seen = set()
+    last = len(text_lower) - 1
+    for end, (keyword, keyword_cats) in automaton.iter(text_lower):
+        if keyword in seen:
+            continue
+        start = end - len(keyword) + 1
+        if start > 0 and is_word_char(keyword[0]) and is_word_char(text_lower[start - 1]):
+            continue
+        if end < last and is_word_char(keyword[-1]) and is_word_char(text_lower[end + 1]):
+            continue
+        seen.add(keyword)
+        for category in keyword_cats:
+            counts[category] += 1
+    return counts
+
+# Every detector's keywords in one word-set lookup and one phrase automaton,
+# so an analysis scans the text once for each
+KEYWORD_CATEGORIES = {
+    **FRAUD_KEYWORD_CATEGORIES,
+    **TOXICITY_KEYWORD_CATEGORIES,
+    **HALLUCINATION_KEYWORD_CATEGORIES,
+    **BIAS_KEYWORD_CATEGORIES,
+}
+KEYWORD_WORDS, KEYWORD_PHRASES = split_keywords(KEYWORD_CATEGORIES)
+PHRASE_PATTERNS = {phrase: compile_phrase_pattern(phrase) for phrases in KEYWORD_PHRASES.values() for phrase in phrases}
+KEYWORD_AUTOMATON = build_keyword_automaton(KEYWORD_PHRASES)
+
+def scan_keywords(text_lower: str) -> dict:
+    """Distinct whole-word keyword counts for every detector category"""
+    counts = count_keywords(KEYWORD_AUTOMATON, KEYWORD_PHRASES, text_lower)
+    words = frozenset(WORD_RE.findall(text_lower))
+    for category, keywords in KEYWORD_WORDS.items():
+        counts[category] += len(words & keywords)
+    return counts
+
+def build_hyperscan_database(patterns: list, name: str):
+    """
+    Compile a pattern list into one Hyperscan database so text is scanned in a single
+    DFA pass, each pattern's id reported at most once. Hyperscan's \b, \w and \d are
+    ASCII-only (\b is unsupported in UCP mode), so the databases are only used for
+    ASCII text, where they agree with Python's re.
+    """
+    if not HYPERSCAN_AVAILABLE:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[p.pattern.encode() for p in patterns],
+            ids=list(range(len(patterns))),
+            flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(patterns),
+        )
+        return db
+    except Exception as e:
+        logger.warning(f"Could not compile Hyperscan {name} database, using re: {e}")
+        return None
+
+PII_DATABASE = build_hyperscan_database(PII_PATTERNS, "PII")
+OFFENSIVE_DATABASE = build_hyperscan_database(OFFENSIVE_PATTERNS, "offensive language")
+UNSUPPORTED_CLAIM_DATABASE = build_hyperscan_database(UNSUPPORTED_CLAIM_PATTERNS, "unsupported claim")
+ABSOLUTE_DATABASE = build_hyperscan_database(ABSOLUTE_PATTERNS, "absolute statement")
+
+# A database's built-in scratch space only supports one scan at a time, and the detectors
+# run on several cpu_executor threads, so every thread scans with scratch of its own
+hyperscan_scratch = threading.local()
+
+def scan_database(database, data: bytes, match_event_handler):
+    """Scan data with a Hyperscan database using the calling thread's scratch space"""
+    scratches = getattr(hyperscan_scratch, 'scratches', None)
+    if scratches is None:
+        scratches = hyperscan_scratch.scratches = {}  # database -> Scratch
+    scratch = scratches.get(database)
+    if scratch is None:
+        scratch = scratches[database] = hyperscan.Scratch(database)
+    database.scan(data, match_event_handler=match_event_handler, scratch=scratch)
+
+def stop_at_first_match(pattern_id, start, end, flags, context):
+    return True  # a truthy return ends the scan
+
+def detect_pii(text: str, text_bytes: Optional[bytes] = None) -> bool:
+    """
+    Detect personally identifiable information using regex patterns
+    text_bytes is text.encode(), if the caller already has it
+    """
+    if PII_DATABASE is not None and text.isascii():
+        if text_bytes is None:
+            text_bytes = text.encode()
+        try:
+            scan_database(PII_DATABASE, text_bytes, stop_at_first_match)
+        except hyperscan.ScanTerminated:
             return True
-    return False
+        return False
+    return PII_UNION.search(text) is not None
 
-def detect_fraud(text: str) -> str:
-    """Detect fraud risk using keyword heuristics"""
-    text_lower = text.lower()
-    
-    # High risk fraud keywords
-    high_risk_keywords = [
-        'guaranteed', 'act now', 'limited time', 'risk-free',
-        'click here now', 'urgent action', 'winner', 'claim your prize',
-        'congratulations you won', 'free money', 'no risk', 'double your',
-        'best price guaranteed', 'lowest price ever', 'cheapest rate',
-        'absolutely free', 'definitely safe', 'without any doubt',
-        'everyone agrees', '100% proven', 'zero risk', 'instant approval'
-    ]
-    
-    # Medium risk keywords
-    medium_risk_keywords = [
-        'offer', 'deal', 'discount', 'special', 'promotion',
-        'exclusive', 'limited', 'hurry', 'bonus', 'sale',
-        'opportunity', 'claim now', 'expires soon'
-    ]
+def detect_fraud(text: str, text_lower: Optional[str] = None, keyword_counts: Optional[dict] = None) -> str:
+    """
+    Detect fraud risk using keyword heuristics
+    text_lower and keyword_counts are text.lower() and scan_keywords(text_lower), if the caller already has them
+    """
+    if text_lower is None:
+        text_lower = text.lower()
     
     # Count matches
-    high_matches = sum(1 for keyword in high_risk_keywords if keyword in text_lower)
-    medium_matches = sum(1 for keyword in medium_risk_keywords if keyword in text_lower)
+    if keyword_counts is None:
+        keyword_counts = scan_keywords(text_lower)
+    high_matches = keyword_counts['high']
+    medium_matches = keyword_counts['medium']
     
     if high_matches >= 2:
         return "HIGH"
@@ -287,26 +971,20 @@ def detect_fraud(text: str) -> str:
     else:
         return "LOW"
 
-def detect_toxicity(text: str) -> str:
-    """Detect toxic language using keyword patterns"""
-    text_lower = text.lower()
-    
-    # High toxicity keywords
-    high_toxic_keywords = [
-        'hate', 'stupid', 'idiot', 'moron', 'dumb',
-        'pathetic', 'worthless', 'disgusting', 'garbage',
-        'trash', 'awful', 'horrible', 'terrible', 'worst'
-    ]
-    
-    # Offensive patterns
-    offensive_patterns = [
-        r'\b(hate|hating|hated)\s+\w+',
-        r'\b(terrible|awful|horrible)\s+(and|or)\s+\w+',
-        r'\b(stupid|dumb|idiotic)\s+\w+'
-    ]
+def detect_toxicity(text: str, text_lower: Optional[str] = None, keyword_counts: Optional[dict] = None) -> str:
+    """
+    Detect toxic language using keyword patterns
+    text_lower and keyword_counts are text.lower() and scan_keywords(text_lower), if the caller already has them
+    """
+    if text_lower is None:
+        text_lower = text.lower()
     
-    keyword_matches = sum(1 for keyword in high_toxic_keywords if keyword in text_lower)
-    pattern_matches = sum(1 for pattern in offensive_patterns if re.search(pattern, text_lower))
+    if keyword_counts is None:
+        keyword_counts = scan_keywords(text_lower)
+    keyword_matches = keyword_counts['toxic']
+    # Only enough offensive patterns to reach HIGH matter
+    pattern_matches = count_matching_patterns(OFFENSIVE_UNION, len(OFFENSIVE_PATTERNS), text_lower,
+                                              limit=3 - keyword_matches, database=OFFENSIVE_DATABASE)
     
     total_matches = keyword_matches + pattern_matches
     
@@ -317,47 +995,34 @@ def detect_toxicity(text: str) -> str:
     else:
         return "LOW"
 
-def detect_hallucination(text: str) -> tuple:
+def detect_hallucination(text: str, text_lower: Optional[str] = None, keyword_counts: Optional[dict] = None) -> tuple:
     """
     Detect potential hallucination using heuristics
     Returns (risk_level, confidence)
+    text_lower and keyword_counts are text.lower() and scan_keywords(text_lower), if the caller already has them
     """
-    text_lower = text.lower()
-    
-    # Indicators of high confidence/certainty (potential hallucination)
-    certainty_phrases = [
-        'definitely', 'certainly', 'absolutely', 'without doubt',
-        'for sure', 'guaranteed', 'proven fact', 'scientific fact',
-        'everyone knows', 'it is known that', 'studies show that',
-        'experts agree', 'always', 'never', '100%', 'all scientists'
-    ]
-    
-    # Vague or hedging phrases (lower hallucination risk)
-    hedging_phrases = [
-        'might', 'could', 'possibly', 'perhaps', 'may',
-        'likely', 'probably', 'seems', 'appears', 'suggests',
-        'according to', 'some sources', 'it is believed'
-    ]
-    
-    # Unsupported claim patterns
-    unsupported_patterns = [
-        r'research shows that \w+',
-        r'studies prove that \w+',
-        r'scientists discovered that \w+',
-        r'\d+% of (people|users|patients)',
-        r'(always|never) (works|fails|happens)'
-    ]
-    
-    certainty_count = sum(1 for phrase in certainty_phrases if phrase in text_lower)
-    hedging_count = sum(1 for phrase in hedging_phrases if phrase in text_lower)
-    unsupported_count = sum(1 for pattern in unsupported_patterns if re.search(pattern, text_lower))
+    if text_lower is None:
+        text_lower = text.lower()
+    
+    if keyword_counts is None:
+        keyword_counts = scan_keywords(text_lower)
+    signal_counts = {signal: keyword_counts[signal] for signal in HALLUCINATION_KEYWORD_CATEGORIES}
+    hedging_count = signal_counts['hedging']
+    
+    # Enough hedging decides LOW on its own (whose confidence only depends on hedging),
+    # so skip the claim regexes when even every pattern matching could not reach MEDIUM
+    keyword_score = sum(HALLUCINATION_WEIGHTS[signal] * count for signal, count in signal_counts.items())
+    max_pattern_score = HALLUCINATION_WEIGHTS['unsupported'] * len(UNSUPPORTED_CLAIM_PATTERNS) + (2 if hedging_count == 0 else 0)
+    if keyword_score + max_pattern_score < 2:
+        return "LOW", 0.80 + (hedging_count * 0.02)
+    signal_counts['unsupported'] = count_matching_patterns(UNSUPPORTED_CLAIM_UNION, len(UNSUPPORTED_CLAIM_PATTERNS), text_lower,
+                                                           database=UNSUPPORTED_CLAIM_DATABASE)
     
     # Calculate risk based on certainty vs hedging
-    risk_score = (certainty_count * 2 + unsupported_count) - hedging_count
+    risk_score = sum(HALLUCINATION_WEIGHTS[signal] * count for signal, count in signal_counts.items())
     
-    # Check for specific numeric claims
-    numeric_claims = len(re.findall(r'\d+%|\d+\.\d+', text))
-    if numeric_claims > 2 and hedging_count == 0:
+    # Check for specific numeric claims (only unhedged text with more than two counts)
+    if hedging_count == 0 and count_matches(NUMERIC_CLAIM_PATTERN, text, limit=3) > 2:
         risk_score += 2
     
     # Determine risk level
@@ -368,27 +1033,20 @@ def detect_hallucination(text: str) -> tuple:
     else:
         return "LOW", 0.80 + (hedging_count * 0.02)
 
-def detect_bias(text: str) -> str:
-    """Detect potential bias in text"""
-    text_lower = text.lower()
-    
-    # Bias indicators
-    bias_keywords = [
-        'obviously', 'clearly', 'it is clear that', 'everyone knows',
-        'no one would', 'any reasonable person', 'common sense',
-        'just', 'simply', 'merely', 'only', 'always better',
-        'never appropriate', 'all experts', 'every study'
-    ]
-    
-    # Absolute statements
-    absolute_patterns = [
-        r'\b(all|every|none|no)\s+\w+\s+(are|is|have|has)',
-        r'\b(always|never)\s+\w+',
-        r'\b(everyone|nobody)\s+(knows|believes|thinks)'
-    ]
+def detect_bias(text: str, text_lower: Optional[str] = None, keyword_counts: Optional[dict] = None) -> str:
+    """
+    Detect potential bias in text
+    text_lower and keyword_counts are text.lower() and scan_keywords(text_lower), if the caller already has them
+    """
+    if text_lower is None:
+        text_lower = text.lower()
     
-    keyword_matches = sum(1 for keyword in bias_keywords if keyword in text_lower)
-    pattern_matches = sum(1 for pattern in absolute_patterns if re.search(pattern, text_lower))
+    if keyword_counts is None:
+        keyword_counts = scan_keywords(text_lower)
+    keyword_matches = keyword_counts['bias']
+    # Only enough absolute-language patterns to reach HIGH matter
+    pattern_matches = count_matching_patterns(ABSOLUTE_UNION, len(ABSOLUTE_PATTERNS), text_lower,
+                                              limit=3 - keyword_matches, database=ABSOLUTE_DATABASE)
     
     total_score = keyword_matches + pattern_matches
     
@@ -399,13 +1057,17 @@ def detect_bias(text: str) -> str:
     else:
         return "LOW"
 
-def calculate_confidence(text: str, risks: dict) -> float:
-    """Calculate overall confidence score based on analysis"""
+def calculate_confidence(text: str, risks: dict, digest: Optional[bytes] = None) -> float:
+    """
+    Calculate overall confidence score based on analysis
+    digest is the text's text_digest() if the caller already has it (e.g. the cache key)
+    """
     # Base confidence
     base_confidence = 0.75
     
-    # Adjust based on text length (longer text = more confident)
-    words = len(text.split())
+    # Adjust based on text length (longer text = more confident); only whether there
+    # are more than 50 or 100 words matters, so stop splitting after 101 words
+    words = len(text.split(maxsplit=100))
     if words > 100:
         length_bonus = 0.10
     elif words > 50:
@@ -438,51 +1100,122 @@ def calculate_confidence(text: str, risks: dict) -> float:
     # Calculate final confidence
     confidence = min(base_confidence + length_bonus + consistency_bonus + pii_bonus, 0.98)
     
-    # Add slight randomness based on text hash for natural variation
-    # Using simple hash for non-security-critical variation
-    text_hash = abs(hash(text)) % 100
-    variation = text_hash / 1000.0  # 0.00 to 0.099
+    # Add slight variation based on the text digest; unlike hash(), BLAKE2b is
+    # not randomized per process, so the same text scores the same after restarts
+    if digest is None:
+        digest = text_digest(text)
+    variation = (digest[0] % 100) / 1000.0  # 0.00 to 0.099
     
     return min(confidence + variation * 0.5, 0.99)
 
+# Summary phrases indexed by risk level (LOW, MEDIUM, HIGH)
+RISK_LEVEL_INDEX = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+SUMMARY_PHRASES = (
+    ("hallucination_risk", (None,
+                            "moderate hallucination risk (some unsupported statements)",
+                            "high hallucination risk detected (unverified claims or excessive certainty)")),
+    ("bias_risk", (None,
+                   "some bias patterns detected",
+                   "significant bias indicators (absolute statements or loaded language)")),
+    ("toxicity_risk", (None,
+                       "potentially offensive language detected",
+                       "toxic or offensive language present")),
+    ("pii_leak", (None,
+                  "personally identifiable information detected (e.g., emails, phone numbers, government IDs)")),
+    ("fraud_risk", (None,
+                    "some fraud-related patterns detected",
+                    "multiple fraud indicators present (urgent language, guarantees, or pressure tactics)")),
+)
+
+def generate_summaries(columns: dict) -> List[str]:
+    """
+    Generate summaries for a batch of analyses given as columns
+    (one list per risk field plus "confidence"), using the phrase tables above
+    """
+    phrase_columns = []
+    for field, phrases in SUMMARY_PHRASES:
+        if field == "pii_leak":
+            indices = (int(bool(value)) for value in columns[field])
+        else:
+            indices = (RISK_LEVEL_INDEX.get(value, 0) for value in columns[field])
+        phrase_columns.append([phrases[index] for index in indices])
+    
+    summaries = []
+    for confidence, *row in zip(columns["confidence"], *phrase_columns):
+        risks = [phrase for phrase in row if phrase]
+        if not risks:
+            summaries.append(f"✓ Content analysis complete. No significant risks detected. This AI-generated content appears safe and appropriate for use. Confidence: {confidence:.1%}.")
+        elif len(risks) == 1:
+            summaries.append(f"⚠ Risk identified: {risks[0]}. Human review recommended before deployment. Confidence: {confidence:.1%}.")
+        elif len(risks) == 2:
+            summaries.append(f"⚠ Multiple risks detected: {risks[0]} and {risks[1]}. Careful human review strongly recommended. Confidence: {confidence:.1%}.")
+        else:
+            # Multiple risks - critical review needed
+            risk_list = ", ".join(risks[:-1]) + f", and {risks[-1]}"
+            summaries.append(f"⚠ Critical: Multiple risk factors identified including {risk_list}. Thorough content review and editing required before use. Confidence: {confidence:.1%}.")
+    return summaries
+
 def generate_summary(hallucination_risk: str, bias_risk: str, toxicity_risk: str, 
                      pii_leak: bool, fraud_risk: str, confidence: float) -> str:
     """Generate a natural language summary of the risk analysis"""
-    risks = []
-    
-    if hallucination_risk == "HIGH":
-        risks.append("high hallucination risk detected (unverified claims or excessive certainty)")
-    elif hallucination_risk == "MEDIUM":
-        risks.append("moderate hallucination risk (some unsupported statements)")
-    
-    if bias_risk == "HIGH":
-        risks.append("significant bias indicators (absolute statements or loaded language)")
-    elif bias_risk == "MEDIUM":
-        risks.append("some bias patterns detected")
-    
-    if toxicity_risk == "HIGH":
-        risks.append("toxic or offensive language present")
-    elif toxicity_risk == "MEDIUM":
-        risks.append("potentially offensive language detected")
-    
-    if pii_leak:
-        risks.append("personally identifiable information detected (e.g., emails, phone numbers, government IDs)")
-    
-    if fraud_risk == "HIGH":
-        risks.append("multiple fraud indicators present (urgent language, guarantees, or pressure tactics)")
-    elif fraud_risk == "MEDIUM":
-        risks.append("some fraud-related patterns detected")
-    
-    if not risks:
-        return f"✓ Content analysis complete. No significant risks detected. This AI-generated content appears safe and appropriate for use. Confidence: {confidence:.1%}."
-    elif len(risks) == 1:
-        return f"⚠ Risk identified: {risks[0]}. Human review recommended before deployment. Confidence: {confidence:.1%}."
-    elif len(risks) == 2:
-        return f"⚠ Multiple risks detected: {risks[0]} and {risks[1]}. Careful human review strongly recommended. Confidence: {confidence:.1%}."
-    else:
-        # Multiple risks - critical review needed
-        risk_list = ", ".join(risks[:-1]) + f", and {risks[-1]}"
-        return f"⚠ Critical: Multiple risk factors identified including {risk_list}. Thorough content review and editing required before use. Confidence: {confidence:.1%}."
+    return generate_summaries({
+        "hallucination_risk": [hallucination_risk],
+        "bias_risk": [bias_risk],
+        "toxicity_risk": [toxicity_risk],
+        "pii_leak": [pii_leak],
+        "fraud_risk": [fraud_risk],
+        "confidence": [confidence],
+    })[0]
+
+# Response cache: identical texts skip MedBERT and the heuristics entirely
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '10000'))
+ANALYSIS_CACHE_TTL = float(os.environ.get('ANALYSIS_CACHE_TTL', '3600'))
+
+# Largest number of texts accepted by POST /analyze_batch
+MAX_ANALYZE_BATCH = int(os.environ.get('MAX_ANALYZE_BATCH', '256'))
+
+def text_digest(text: str, text_bytes: Optional[bytes] = None) -> bytes:
+    """
+    16-byte BLAKE2b digest of the text, used as the cache key
+    text_bytes is text.encode(), if the caller already has it
+    """
+    if text_bytes is None:
+        text_bytes = text.encode()
+    return blake2b(text_bytes, digest_size=16).digest()
+
+class AnalysisCache:
+    """Bounded LRU cache of analysis results with a time-to-live, keyed on text_digest"""
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # digest -> (expires_at, analysis)
+        self._lock = threading.Lock()
+    
+    def get(self, key: bytes) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key: bytes, analysis: dict):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, analysis)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+analysis_cache = AnalysisCache(ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL)
 
 # Sample text constant for demo endpoint
 DEMO_SAMPLE_TEXT = (
@@ -494,20 +1227,53 @@ DEMO_SAMPLE_TEXT = (
     "with zero risk and instant results."
 )
 
-def _perform_risk_analysis(text: str) -> dict:
+def run_heuristic_detectors(text: str, include_hallucination_bias: bool = True,
+                            text_bytes: Optional[bytes] = None) -> dict:
+    """
+    Run the heuristic detectors on text, sharing one lowercased copy and one keyword scan.
+    Hallucination and bias are only needed when MedBERT does not score the text.
+    text_bytes is text.encode(), if the caller already has it
+    """
+    text_lower = text.lower()
+    keyword_counts = scan_keywords(text_lower)
+    heuristics = {
+        'toxicity_risk': detect_toxicity(text, text_lower, keyword_counts),
+        'pii_leak': detect_pii(text, text_bytes),
+        'fraud_risk': detect_fraud(text, text_lower, keyword_counts),
+    }
+    if include_hallucination_bias:
+        heuristics['hallucination'] = detect_hallucination(text, text_lower, keyword_counts)
+        heuristics['bias_risk'] = detect_bias(text, text_lower, keyword_counts)
+    return heuristics
+
+def _perform_risk_analysis(text: str, medbert_prediction: Optional[tuple] = None,
+                           digest: Optional[bytes] = None, heuristics: Optional[dict] = None) -> dict:
     """
     Internal function to perform risk analysis on text.
     Used by both the demo endpoint and the analyze endpoint.
     
+    medbert_prediction is an already computed (label, confidence, second_probability)
+    tuple, e.g. from the batch worker; otherwise MedBERT is run on model_executor
+    for texts of at least MIN_BERT_WORDS words.
+    digest is the text's text_digest(), reused for the confidence variation.
+    heuristics is an already computed run_heuristic_detectors() result.
+    
     Returns a dictionary with all risk analysis fields.
     """
+    if heuristics is None:
+        heuristics = {}
+    
     # Try MedBERT prediction first if model is loaded
     medbert_risk = None
     medbert_confidence = None
-    medbert_probs = None
+    medbert_second_prob = None
     
-    if model_loaded:
-        medbert_risk, medbert_confidence, medbert_probs = predict_with_medbert(text)
+    if medbert_prediction is not None:
+        medbert_risk, medbert_confidence, medbert_second_prob = medbert_prediction
+        if medbert_risk:
+            logger.info(f"MedBERT prediction: {medbert_risk} (confidence: {medbert_confidence:.3f})")
+    elif needs_medbert(text):
+        medbert_risk, medbert_confidence, medbert_second_prob = model_executor.submit(predict_with_medbert, text).result()
         if medbert_risk:
             logger.info(f"MedBERT prediction: {medbert_risk} (confidence: {medbert_confidence:.3f})")
     
@@ -523,23 +1289,26 @@ def _perform_risk_analysis(text: str) -> dict:
             hallucination_risk = "LOW"
             base_confidence = medbert_confidence
         
-        # Derive bias risk from MedBERT probabilities
+        # Derive bias risk from the runner-up MedBERT class probability
         bias_risk = "LOW"
-        if medbert_probs is not None and len(medbert_probs) > 1:
-            sorted_probs = sorted(medbert_probs, reverse=True)
-            if sorted_probs[1] > 0.35:
+        if medbert_second_prob is not None:
+            if medbert_second_prob > 0.35:
                 bias_risk = "MEDIUM"
-            if sorted_probs[1] > 0.45:
+            if medbert_second_prob > 0.45:
                 bias_risk = "HIGH"
     else:
         # Fallback to heuristic detection
-        hallucination_risk, base_confidence = detect_hallucination(text)
-        bias_risk = detect_bias(text)
+        if 'hallucination' not in heuristics:
+            heuristics = run_heuristic_detectors(text)
+        hallucination_risk, base_confidence = heuristics['hallucination']
+        bias_risk = heuristics['bias_risk']
     
     # Always run heuristic detections for toxicity, PII, and fraud
-    toxicity_risk = detect_toxicity(text)
-    pii_leak = detect_pii(text)
-    fraud_risk = detect_fraud(text)
+    if 'toxicity_risk' not in heuristics:
+        heuristics = run_heuristic_detectors(text, include_hallucination_bias=False)
+    toxicity_risk = heuristics['toxicity_risk']
+    pii_leak = heuristics['pii_leak']
+    fraud_risk = heuristics['fraud_risk']
     
     # Store risks for confidence calculation
     risks = {
@@ -558,7 +1327,7 @@ def _perform_risk_analysis(text: str) -> dict:
         if toxicity_risk == "HIGH" or fraud_risk == "HIGH":
             confidence = min(confidence + 0.03, 0.99)
     else:
-        confidence = calculate_confidence(text, risks)
+        confidence = calculate_confidence(text, risks, digest)
     
     # Generate summary
     summary = generate_summary(
@@ -580,28 +1349,107 @@ def _perform_risk_analysis(text: str) -> dict:
         'engine_used': engine_used
     }
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize service on startup"""
-    logger.info("=" * 60)
-    logger.info("🚀 AI Risk Mitigation ML Service - Production Engine")
-    logger.info("=" * 60)
-    
-    # Try to load MedBERT model
+DEMO_CACHE_KEY = text_digest(DEMO_SAMPLE_TEXT)
+
+def demo_analysis() -> dict:
+    """Analysis of DEMO_SAMPLE_TEXT, served from the analysis cache when present"""
+    analysis = analysis_cache.get(DEMO_CACHE_KEY)
+    if analysis is None:
+        bundle = model_bundle
+        medbert_prediction = None
+        if bundle is not None and needs_medbert(DEMO_SAMPLE_TEXT):
+            # Called from the threadpool and the loader thread, so hand the forward pass to
+            # model_executor instead of racing the batch worker for the model
+            medbert_prediction = model_executor.submit(predict_with_medbert, DEMO_SAMPLE_TEXT).result()
+        analysis = _perform_risk_analysis(DEMO_SAMPLE_TEXT, medbert_prediction, DEMO_CACHE_KEY)
+        if bundle is model_bundle:  # skip caching a heuristics result if MedBERT finished loading meanwhile
+            analysis_cache.put(DEMO_CACHE_KEY, analysis)
+    return analysis
+
+def load_medbert_in_background():
+    """Load MedBERT off the event loop; requests are served from heuristics until it is ready"""
+    start_time = time.time()
     medbert_success = load_medbert_model()
     
     if medbert_success:
-        logger.info("✅ ENGINE: MedBERT + Heuristics (HYBRID MODE)")
+        logger.info(f"✅ ENGINE: MedBERT + Heuristics (HYBRID MODE) - ready after {time.time() - start_time:.1f}s")
         logger.info("   → MedBERT: Hallucination & Bias detection")
         logger.info("   → Heuristics: Toxicity, PII, Fraud detection")
+        logger.info(f"   → Dynamic batching: up to {MAX_BATCH_SIZE} texts / {MAX_BATCH_DELAY_MS}ms per length bucket")
+        demo_analysis()  # re-warm the demo entry the model load cleared from the cache
     else:
         logger.info("⚠️ ENGINE: Heuristics Only (MedBERT unavailable)")
         logger.info("   → Using rule-based analysis for all risk categories")
         logger.info("   → Production-grade fallback active")
+
+async def analyze_text(text: str) -> dict:
+    """Analysis of an already stripped text, from the analysis cache when present"""
+    # Encode once for both the cache key and the Hyperscan PII scan
+    text_bytes = text.encode()
+    cache_key = text_digest(text, text_bytes)
+    analysis = analysis_cache.get(cache_key)
+    if analysis is None:
+        bundle = model_bundle
+        use_medbert = needs_medbert(text)
+        
+        if not use_medbert and len(text) <= INLINE_HEURISTICS_MAX_CHARS:
+            # Short texts take a few microseconds to scan, less than the executor hop
+            medbert_prediction = None
+            heuristics = run_heuristic_detectors(text, True, text_bytes)
+        else:
+            # The CPU-bound heuristics run on the executor while MedBERT runs through the
+            # batch worker (where concurrent requests share a forward pass), overlapping the two
+            heuristics_future = asyncio.get_running_loop().run_in_executor(
+                cpu_executor, run_heuristic_detectors, text, not use_medbert, text_bytes
+            )
+            medbert_prediction = await submit_to_medbert(text) if use_medbert else None
+            heuristics = await heuristics_future
+        
+        # Combine the results using shared function
+        analysis = _perform_risk_analysis(text, medbert_prediction, cache_key, heuristics)
+        if bundle is model_bundle:  # skip caching a heuristics result if MedBERT finished loading meanwhile
+            analysis_cache.put(cache_key, analysis)
+    return analysis
+
+def build_response(analysis: dict, processing_time: float) -> AnalysisResponse:
+    """AnalysisResponse for an analysis dict and its latency in ms"""
+    return AnalysisResponse(
+        hallucination_risk=analysis['hallucination_risk'],
+        bias_risk=analysis['bias_risk'],
+        toxicity_risk=analysis['toxicity_risk'],
+        pii_leak=analysis['pii_leak'],
+        fraud_risk=analysis['fraud_risk'],
+        confidence_score=round(analysis['confidence_score'], 3),
+        summary=analysis['summary'],
+        engine_used=analysis['engine_used'],
+        medbert_loaded=model_bundle is not None,
+        processing_time_ms=round(processing_time, 1)
+    )
+
+@app.on_event("startup")
+async def startup_event():
+    """Initialize service on startup"""
+    logger.info("=" * 60)
+    logger.info("🚀 AI Risk Mitigation ML Service - Production Engine")
+    logger.info("=" * 60)
+    
+    # The batch worker idles until the first MedBERT request is queued, so it can
+    # start before the model; submit_to_medbert is only reached once model_bundle is set
+    global bucket_queues, batch_ready, batch_worker_task
+    bucket_queues = [deque() for _ in LENGTH_BUCKETS]
+    batch_ready = asyncio.Event()
+    batch_worker_task = asyncio.create_task(batch_worker())
+    batch_worker_task.add_done_callback(batch_worker_done)
+    
+    # Warm the cache so the first / request is a hit
+    demo_analysis()
+    
+    # Load MedBERT on a background thread; requests see it once model_bundle is published
+    threading.Thread(target=load_medbert_in_background, name="medbert-loader", daemon=True).start()
     
     logger.info("=" * 60)
     logger.info("✅ Service operational - Ready to analyze content")
-    logger.info(f"📊 Engine Mode: {'HYBRID' if medbert_success else 'HEURISTICS'}")
+    logger.info("📊 Engine Mode: HEURISTICS until MedBERT finishes loading in the background")
     logger.info("🔗 API Documentation: /docs")
     logger.info("=" * 60)
 
@@ -625,8 +1473,8 @@ def root_demo():
     start_time = time.time()
     
     try:
-        # Perform actual risk analysis using shared function
-        analysis = _perform_risk_analysis(DEMO_SAMPLE_TEXT)
+        # Perform actual risk analysis using shared function (cached, and warmed at startup)
+        analysis = demo_analysis()
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -635,18 +1483,7 @@ def root_demo():
                    f"T:{analysis['toxicity_risk']} P:{analysis['pii_leak']} "
                    f"F:{analysis['fraud_risk']} C:{analysis['confidence_score']:.2f}")
         
-        return AnalysisResponse(
-            hallucination_risk=analysis['hallucination_risk'],
-            bias_risk=analysis['bias_risk'],
-            toxicity_risk=analysis['toxicity_risk'],
-            pii_leak=analysis['pii_leak'],
-            fraud_risk=analysis['fraud_risk'],
-            confidence_score=round(analysis['confidence_score'], 3),
-            summary=analysis['summary'],
-            engine_used=analysis['engine_used'],
-            medbert_loaded=model_loaded,
-            processing_time_ms=round(processing_time, 1)
-        )
+        return build_response(analysis, processing_time)
         
     except Exception as e:
         logger.error(f"Demo analysis error: {e}")
@@ -681,7 +1518,7 @@ def root_demo():
                 confidence_score=round(confidence, 3),
                 summary=summary,
                 engine_used="heuristics",
-                medbert_loaded=model_loaded,
+                medbert_loaded=model_bundle is not None,
                 processing_time_ms=0.5
             )
         except Exception as fallback_error:
@@ -696,7 +1533,7 @@ def root_demo():
                 confidence_score=0.850,
                 summary="⚠ Critical: Multiple risk factors identified including high hallucination risk detected (unverified claims or excessive certainty), significant bias indicators (absolute statements or loaded language), personally identifiable information detected (e.g., emails, phone numbers, government IDs), and multiple fraud indicators present (urgent language, guarantees, or pressure tactics). Thorough content review and editing required before use. Confidence: 85.0%.",
                 engine_used="heuristics",
-                medbert_loaded=model_loaded,
+                medbert_loaded=model_bundle is not None,
                 processing_time_ms=0.5
             )
 
@@ -730,9 +1567,7 @@ async def analyze(req: TextRequest):
             raise HTTPException(status_code=400, detail="Text cannot be empty")
         
         text = req.text.strip()
-        
-        # Perform risk analysis using shared function
-        analysis = _perform_risk_analysis(text)
+        analysis = await analyze_text(text)
         
         processing_time = (time.time() - start_time) * 1000  # Convert to ms
         
@@ -741,18 +1576,7 @@ async def analyze(req: TextRequest):
                    f"T:{analysis['toxicity_risk']} P:{analysis['pii_leak']} "
                    f"F:{analysis['fraud_risk']} C:{analysis['confidence_score']:.2f}")
         
-        return AnalysisResponse(
-            hallucination_risk=analysis['hallucination_risk'],
-            bias_risk=analysis['bias_risk'],
-            toxicity_risk=analysis['toxicity_risk'],
-            pii_leak=analysis['pii_leak'],
-            fraud_risk=analysis['fraud_risk'],
-            confidence_score=round(analysis['confidence_score'], 3),
-            summary=analysis['summary'],
-            engine_used=analysis['engine_used'],
-            medbert_loaded=model_loaded,
-            processing_time_ms=round(processing_time, 1)
-        )
+        return build_response(analysis, processing_time)
         
     except HTTPException:
         raise
@@ -761,3 +1585,46 @@ async def analyze(req: TextRequest):
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@app.post("/analyze_batch", response_model=List[AnalysisResponse])
+async def analyze_batch(req: BatchTextRequest):
+    """
+    Batch Risk Analysis Endpoint
+    
+    Analyzes several texts in one request and returns one result per text, in order,
+    with the same fields as POST /analyze. Duplicate texts are analyzed once, and the
+    texts that go to MedBERT share forward passes in the batch worker.
+    
+    Batches of around 64 texts work well; at most MAX_ANALYZE_BATCH texts are accepted.
+    processing_time_ms is the latency of the whole batch.
+    """
+    start_time = time.time()
+    
+    try:
+        if not req.texts:
+            raise HTTPException(status_code=400, detail="Texts cannot be empty")
+        if len(req.texts) > MAX_ANALYZE_BATCH:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_ANALYZE_BATCH} texts per batch")
+        
+        texts = [text.strip() for text in req.texts]
+        for i, text in enumerate(texts):
+            if not text:
+                raise HTTPException(status_code=400, detail=f"Text {i} cannot be empty")
+        
+        # Analyze each distinct text once, all concurrently
+        unique = list(dict.fromkeys(texts))
+        analyses = await asyncio.gather(*(analyze_text(text) for text in unique))
+        analysis_by_text = dict(zip(unique, analyses))
+        
+        processing_time = (time.time() - start_time) * 1000
+        logger.info(f"Batch analysis complete: {len(texts)} texts ({len(unique)} distinct) in {processing_time:.1f}ms")
+        
+        return [build_response(analysis_by_text[text], processing_time) for text in texts]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch analysis error: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
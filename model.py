@@ -9,6 +9,8 @@ import numpy as np
 from tqdm import tqdm
 import time
 import os  # Added for saving
+import json
+from safetensors.torch import save_file
 
 class RiskDataset(Dataset):
     def __init__(self, texts, labels, tokenizer, max_len):
@@ -24,22 +26,38 @@ class RiskDataset(Dataset):
         text = str(self.texts[item])
         label = self.labels[item]
 
-        encoding = self.tokenizer.encode_plus(
+        # No padding here: collate() pads each batch to its longest sequence
+        encoding = self.tokenizer(
             text,
             add_special_tokens=True,
             max_length=self.max_len,
             return_token_type_ids=False,
-            padding='max_length',
             truncation=True,
             return_attention_mask=True,
-            return_tensors='pt',
         )
 
         return {
             'text': text,
-            'input_ids': encoding['input_ids'].flatten(),
-            'attention_mask': encoding['attention_mask'].flatten(),
-            'labels': torch.tensor(label, dtype=torch.long)
+            'input_ids': encoding['input_ids'],
+            'attention_mask': encoding['attention_mask'],
+            'labels': label
+        }
+
+    def collate(self, batch):
+        """Pad a list of items to the longest sequence in the batch"""
+        padded = self.tokenizer.pad(
+            {
+                'input_ids': [d['input_ids'] for d in batch],
+                'attention_mask': [d['attention_mask'] for d in batch],
+            },
+            padding='longest',
+            return_tensors='pt',
+        )
+        return {
+            'text': [d['text'] for d in batch],
+            'input_ids': padded['input_ids'],
+            'attention_mask': padded['attention_mask'],
+            'labels': torch.tensor([d['labels'] for d in batch], dtype=torch.long)
         }
 
 class RiskClassifier(nn.Module):
@@ -102,7 +120,7 @@ def predict(model, text, tokenizer, device, max_len, label_mapping):
     labels = [0]  # Dummy label
 
     dataset = RiskDataset(texts, labels, tokenizer, max_len)
-    data_loader = DataLoader(dataset, batch_size=1)
+    data_loader = DataLoader(dataset, batch_size=1, collate_fn=dataset.collate)
 
     with torch.no_grad():
         for d in data_loader:
@@ -197,7 +215,8 @@ if __name__ == "__main__":
         shuffle=True,
         num_workers=4,
         pin_memory=True,
-        persistent_workers=True
+        persistent_workers=True,
+        collate_fn=train_dataset.collate
     )
 
     # Move model to device
@@ -239,7 +258,7 @@ if __name__ == "__main__":
 
     # Quick evaluation
     test_dataset = RiskDataset(test_texts, test_labels, tokenizer, MAX_LEN)
-    test_data_loader = DataLoader(test_dataset, batch_size=BATCH_SIZE)
+    test_data_loader = DataLoader(test_dataset, batch_size=BATCH_SIZE, collate_fn=test_dataset.collate)
 
     model.eval()
     y_pred, y_test = [], []
@@ -307,6 +326,23 @@ if __name__ == "__main__":
                 'device_used': str(device)
             }
         }, f"{model_dir}/classifier_weights.pth")
+
+        # Same weights as safetensors for fast, pickle-free loading at serve time
+        save_file(
+            {k: v.contiguous() for k, v in model.state_dict().items()},
+            f"{model_dir}/classifier_weights.safetensors",
+            metadata={
+                'label_mapping': json.dumps(label_mapping),
+                'num_classes': str(num_classes),
+                'model_config': json.dumps({
+                    'max_len': MAX_LEN,
+                    'model_name': MODEL_NAME,
+                    'batch_size': BATCH_SIZE,
+                    'epochs_trained': EPOCHS,
+                    'learning_rate': LEARNING_RATE
+                }),
+            },
+        )
         
         print(f"✅ Model successfully saved to '{model_dir}' directory!")
         print(f"📁 Files saved:")
@@ -314,6 +350,7 @@ if __name__ == "__main__":
         print(f"   - config.json (model configuration)")
         print(f"   - tokenizer files")
         print(f"   - classifier_weights.pth (custom classifier + metadata)")
+        print(f"   - classifier_weights.safetensors (same weights, safetensors format)")
         print(f"📊 Final accuracy: {final_accuracy:.4f}")
         print(f"⏰ Training time: {total_time:.1f}s ({total_time/60:.1f} minutes)")
         
@@ -1,12 +1,12 @@
 from load_model import load_trained_model, predict_single
 
 # Load the model once
-model, tokenizer, label_mapping, config, device = load_trained_model()
+model, tokenizer, label_mapping, reverse_label_mapping, config, device = load_trained_model()
 
 def quick_predict(text):
     """Quick prediction function"""
     predicted_label, confidence, _ = predict_single(
-        model, tokenizer, text, label_mapping, config['max_len'], device
+        model, tokenizer, text, reverse_label_mapping, config['max_len'], device
     )
     return predicted_label, confidence
 
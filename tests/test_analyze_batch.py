@@ -0,0 +1,95 @@
+"""POST /analyze_batch, served from heuristics (the startup event, and so MedBERT, is not run)"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import ml_service
+
+TEXTS = [
+    "Act now! This risk-free offer makes you a winner.",
+    "My email is jane.doe@example.com and my phone is 555-123-4567.",
+    "The weather was pleasant today.",
+]
+
+
+@pytest.fixture
+def client():
+    ml_service.analysis_cache.clear()
+    yield TestClient(ml_service.app)
+    ml_service.analysis_cache.clear()
+
+
+@pytest.fixture
+def analyzed_texts(monkeypatch):
+    """Record the texts analyze_text is called with"""
+    calls = []
+    analyze_text = ml_service.analyze_text
+
+    async def recording_analyze_text(text):
+        calls.append(text)
+        return await analyze_text(text)
+
+    monkeypatch.setattr(ml_service, 'analyze_text', recording_analyze_text)
+    return calls
+
+
+def without_timing(result):
+    return {key: value for key, value in result.items() if key != 'processing_time_ms'}
+
+
+def test_results_match_analyze_in_input_order(client):
+    response = client.post("/analyze_batch", json={"texts": TEXTS})
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == len(TEXTS)
+    for text, result in zip(TEXTS, results):
+        single = client.post("/analyze", json={"text": text}).json()
+        assert without_timing(result) == without_timing(single)
+    assert results[0]['fraud_risk'] == "HIGH"
+    assert results[1]['pii_leak'] is True
+
+
+def test_duplicate_texts_are_analyzed_once(client, analyzed_texts):
+    texts = [TEXTS[0], TEXTS[1], TEXTS[0], "  " + TEXTS[1] + "\n", TEXTS[2]]
+    response = client.post("/analyze_batch", json={"texts": texts})
+    assert response.status_code == 200
+    results = response.json()
+    assert sorted(analyzed_texts) == sorted(TEXTS)
+    assert [without_timing(r) for r in results] == [without_timing(results[i]) for i in (0, 1, 0, 1, 4)]
+    assert results[0] != results[1]
+
+
+def test_empty_list_is_rejected(client):
+    response = client.post("/analyze_batch", json={"texts": []})
+    assert response.status_code == 400
+    assert response.json()['detail'] == "Texts cannot be empty"
+
+
+def test_empty_text_is_rejected(client):
+    response = client.post("/analyze_batch", json={"texts": [TEXTS[0], "   "]})
+    assert response.status_code == 400
+    assert response.json()['detail'] == "Text 1 cannot be empty"
+
+
+def test_batch_size_limit(client, monkeypatch):
+    monkeypatch.setattr(ml_service, 'MAX_ANALYZE_BATCH', 3)
+    assert client.post("/analyze_batch", json={"texts": TEXTS}).status_code == 200
+    response = client.post("/analyze_batch", json={"texts": TEXTS + ["one more"]})
+    assert response.status_code == 400
+    assert response.json()['detail'] == "At most 3 texts per batch"
+
+
+def test_processing_time_is_the_whole_batch_latency(client, monkeypatch):
+    analyze_text = ml_service.analyze_text
+
+    async def slow_analyze_text(text):
+        await asyncio.sleep(0.05)
+        return await analyze_text(text)
+
+    monkeypatch.setattr(ml_service, 'analyze_text', slow_analyze_text)
+    results = client.post("/analyze_batch", json={"texts": TEXTS}).json()
+    times = {result['processing_time_ms'] for result in results}
+    assert len(times) == 1
+    # The texts are analyzed concurrently, so the batch takes about one text's latency
+    assert 50 <= times.pop() < 50 * len(TEXTS)
@@ -0,0 +1,20 @@
+"""Heuristic detectors called from several threads at once, as cpu_executor does"""
+from concurrent.futures import ThreadPoolExecutor
+
+import ml_service
+
+# Long texts keep several Hyperscan scans in flight at the same time; scans sharing
+# one scratch space raise ScratchInUseError or corrupt each other's matches
+BASE_TEXT = "Research shows that everyone agrees. I hate this awful idea. All people are tired. " * 5000
+TEXTS = [BASE_TEXT, BASE_TEXT + "Call 555-123-4567 or write to jane.doe@example.com."]
+
+
+def test_concurrent_detectors_match_sequential_results():
+    expected = [ml_service.run_heuristic_detectors(text) for text in TEXTS]
+    assert expected[0]['pii_leak'] is False
+    assert expected[1]['pii_leak'] is True
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: ml_service.run_heuristic_detectors(TEXTS[i % 2]), range(64)))
+
+    assert results == [expected[i % 2] for i in range(64)]
@@ -0,0 +1,69 @@
+"""Whole-word keyword matching used by the heuristic detectors"""
+import pytest
+
+import ml_service
+
+
+@pytest.fixture(params=['automaton', 'fallback'])
+def scan_keywords(request, monkeypatch):
+    """scan_keywords with the Aho-Corasick automaton and with the regex fallback used without pyahocorasick"""
+    if request.param == 'automaton':
+        if ml_service.KEYWORD_AUTOMATON is None:
+            pytest.skip("pyahocorasick is not installed")
+    else:
+        monkeypatch.setattr(ml_service, 'KEYWORD_AUTOMATON', None)
+    return ml_service.scan_keywords
+
+
+def test_split_keywords_separates_words_and_phrases():
+    words, phrases = ml_service.split_keywords({'fraud': ['winner', 'act now', 'risk-free', '100%']})
+    assert words == {'fraud': frozenset({'winner'})}
+    assert phrases == {'fraud': ('act now', 'risk-free', '100%')}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("you are a winner", 1),
+    ("winner, winner!", 1),  # distinct keywords are counted once
+    ("a winnerless season", 0),
+    ("the frontrunner is a non-winner", 1),
+    ("winners are announced", 0),
+])
+def test_single_word_keywords(scan_keywords, text, expected):
+    assert scan_keywords(text)['high'] == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("act now before it ends", 1),
+    ("react now", 0),
+    ("act nowhere", 0),
+    ("this is risk-free.", 1),
+    ("a risk-freebie", 0),
+    ("it is 100% proven", 1),
+    ("1100% proven", 0),
+    ("100% provenance", 0),
+])
+def test_phrase_keywords(scan_keywords, text, expected):
+    assert scan_keywords(text)['high'] == expected
+
+
+def test_categories_are_counted_together(scan_keywords):
+    counts = scan_keywords("winner! act now for this exclusive deal, definitely risk-free")
+    assert counts['high'] == 3
+    assert counts['medium'] == 2
+    assert counts['certainty'] == 1
+    assert counts['toxic'] == 0
+
+
+def test_fallback_matches_automaton():
+    if ml_service.KEYWORD_AUTOMATON is None:
+        pytest.skip("pyahocorasick is not installed")
+    texts = [
+        "Act now! This risk-free, 100% proven offer makes you a winner.",
+        "Research shows that this is absolutely free and there is no risk at all.",
+        "That stupid idea is the worst; perhaps it might work, possibly not.",
+        "whatever happened to the frontrunners and their deals",
+    ]
+    for text in texts:
+        text_lower = text.lower()
+        assert (ml_service.count_keywords(None, ml_service.KEYWORD_PHRASES, text_lower)
+                == ml_service.count_keywords(ml_service.KEYWORD_AUTOMATON, ml_service.KEYWORD_PHRASES, text_lower))